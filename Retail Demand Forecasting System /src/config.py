@@ -56,6 +56,15 @@ class ModelConfig:
     wf_test_days: int = 28
     wf_step_days: int = 28
 
+    # Ensemble prediction runs base models on this many threads
+    ensemble_n_jobs: int = 3
+
+    @property
+    def gbm_n_jobs(self) -> int:
+        """Native threads per XGBoost/LightGBM model: its share of the cores
+        when the ensemble predicts concurrently, so threads don't oversubscribe."""
+        return max(1, (os.cpu_count() or 1) // max(1, self.ensemble_n_jobs))
+
 
 @dataclass
 class DatabaseConfig:
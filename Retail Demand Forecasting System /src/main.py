@@ -33,6 +33,16 @@ from src.utils.visualization import (
 logger = structlog.get_logger()
 
 
+def _write_csv(df: pd.DataFrame, path: str, **polars_kwargs) -> None:
+    """Write a frame with polars' native CSV writer, falling back to pandas."""
+    try:
+        import polars as pl
+        pl.from_pandas(df).write_csv(path, **polars_kwargs)
+    except ImportError:
+        # polars missing, or pyarrow missing for non-numpy column dtypes
+        df.to_csv(path, index=False)
+
+
 def main():
     """Run full demand forecasting pipeline."""
     structlog.configure(
@@ -113,11 +123,13 @@ def main():
             n_estimators=config.model.xgb_n_estimators,
             max_depth=config.model.xgb_max_depth,
             learning_rate=config.model.xgb_learning_rate,
+            n_jobs=config.model.gbm_n_jobs,
         ),
         "lightgbm": LightGBMForecaster(
             n_estimators=config.model.lgb_n_estimators,
             num_leaves=config.model.lgb_num_leaves,
             learning_rate=config.model.lgb_learning_rate,
+            n_jobs=config.model.gbm_n_jobs,
         ),
         "sarima": SARIMAForecaster(
             order=config.model.sarima_order,
@@ -156,7 +168,9 @@ def main():
     ensemble_weights = {k: round(v / total, 3) for k, v in inv_mape.items()}
     print(f"   Weights: {ensemble_weights}")
 
-    ensemble = EnsembleForecaster(list(models.values()), ensemble_weights)
+    ensemble = EnsembleForecaster(
+        list(models.values()), ensemble_weights, n_jobs=config.model.ensemble_n_jobs,
+    )
     ens_preds = ensemble.predict(val)
     ens_metrics = compute_metrics(y_val.values, ens_preds)
     print(f"   ensemble     MAE={ens_metrics.mae:>8.1f}  RMSE={ens_metrics.rmse:>8.1f}  "
@@ -210,7 +224,7 @@ def main():
     export_df = test[["date", "quantity"]].copy()
     for name, r in test_results.items():
         export_df[f"pred_{name}"] = r["predictions"]
-    export_df.to_csv(f"{output_dir}/predictions.csv", index=False)
+    _write_csv(export_df, f"{output_dir}/predictions.csv", datetime_format="%Y-%m-%d")
 
     # Save summary
     summary = {name: {
@@ -218,7 +232,8 @@ def main():
         "mape": r["metrics"].mape, "r_squared": r["metrics"].r_squared,
         "bias": r["metrics"].bias,
     } for name, r in test_results.items()}
-    pd.DataFrame(summary).T.to_csv(f"{output_dir}/model_comparison.csv")
+    summary_df = pd.DataFrame(summary).T.rename_axis("model").reset_index()
+    _write_csv(summary_df, f"{output_dir}/model_comparison.csv")
     print(f"   ✓ Saved: {output_dir}/predictions.csv, model_comparison.csv")
 
     elapsed = time.perf_counter() - t0
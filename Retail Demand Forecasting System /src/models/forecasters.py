@@ -9,6 +9,7 @@ import numpy as np
 import pandas as pd
 from typing import Dict, List, Optional, Tuple
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 import warnings
 import structlog
 
@@ -36,10 +37,10 @@ class BaseForecaster(ABC):
 class XGBoostForecaster(BaseForecaster):
     """XGBoost gradient boosting forecaster."""
 
-    def __init__(self, n_estimators=500, max_depth=6, learning_rate=0.05, seed=42):
+    def __init__(self, n_estimators=500, max_depth=6, learning_rate=0.05, seed=42, n_jobs=None):
         self.params = dict(
             n_estimators=n_estimators, max_depth=max_depth,
-            learning_rate=learning_rate, random_state=seed,
+            learning_rate=learning_rate, random_state=seed, n_jobs=n_jobs,
             subsample=0.8, colsample_bytree=0.8,
             min_child_weight=5, reg_alpha=0.1, reg_lambda=1.0,
         )
@@ -78,10 +79,10 @@ class XGBoostForecaster(BaseForecaster):
 class LightGBMForecaster(BaseForecaster):
     """LightGBM gradient boosting forecaster."""
 
-    def __init__(self, n_estimators=500, num_leaves=31, learning_rate=0.05, seed=42):
+    def __init__(self, n_estimators=500, num_leaves=31, learning_rate=0.05, seed=42, n_jobs=None):
         self.params = dict(
             n_estimators=n_estimators, num_leaves=num_leaves,
-            learning_rate=learning_rate, random_state=seed,
+            learning_rate=learning_rate, random_state=seed, n_jobs=n_jobs,
             subsample=0.8, colsample_bytree=0.8,
             min_child_samples=20, reg_alpha=0.1, reg_lambda=1.0,
             verbosity=-1,
@@ -203,10 +204,24 @@ class ProphetForecaster(BaseForecaster):
 
 
 class EnsembleForecaster(BaseForecaster):
-    """Weighted ensemble of multiple forecasters."""
-
-    def __init__(self, models: List[BaseForecaster], weights: Optional[Dict[str, float]] = None):
+    """
+    Weighted ensemble of multiple forecasters.
+
+    Base models predict one after another by default. XGBoost and LightGBM
+    already use every core, so running them side by side only oversubscribes
+    the CPU. Pass n_jobs > 1 to predict on that many threads, and give the
+    base models a matching per-model n_jobs cap (the pipeline takes both
+    from ModelConfig.ensemble_n_jobs and ModelConfig.gbm_n_jobs).
+    """
+
+    def __init__(
+        self,
+        models: List[BaseForecaster],
+        weights: Optional[Dict[str, float]] = None,
+        n_jobs: int = 1,
+    ):
         self.models = models
+        self.n_jobs = n_jobs
         self.weights = weights or {m.name: 1.0 / len(models) for m in models}
         self._normalize_weights()
 
@@ -221,13 +236,19 @@ class EnsembleForecaster(BaseForecaster):
         return self
 
     def predict(self, X_test: pd.DataFrame) -> np.ndarray:
-        predictions = np.zeros(len(X_test))
-        for model in self.models:
-            w = self.weights.get(model.name, 0)
-            if w > 0:
-                preds = model.predict(X_test)
-                predictions += w * preds
-        return np.maximum(predictions, 0)
+        active = [m for m in self.models if self.weights.get(m.name, 0) > 0]
+        if not active:
+            return np.zeros(len(X_test))
+
+        if self.n_jobs > 1 and len(active) > 1:
+            with ThreadPoolExecutor(max_workers=min(self.n_jobs, len(active))) as ex:
+                outputs = list(ex.map(lambda m: m.predict(X_test), active))
+        else:
+            outputs = [m.predict(X_test) for m in active]
+        stack = np.vstack([np.asarray(p, dtype=float) for p in outputs])
+
+        weights = np.array([self.weights[m.name] for m in active])
+        return np.maximum(weights @ stack, 0)
 
     @property
     def name(self) -> str:
@@ -142,6 +142,17 @@ class TestModels:
         preds = ens.predict(self.X_test)
         assert len(preds) == len(self.X_test)
 
+    def test_threaded_ensemble_matches_serial(self):
+        m1 = XGBoostForecaster(n_estimators=30, n_jobs=1)
+        m2 = LightGBMForecaster(n_estimators=30, n_jobs=1)
+        m1.fit(self.X_train, self.y_train)
+        m2.fit(self.X_train, self.y_train)
+
+        weights = {"xgboost": 0.6, "lightgbm": 0.4}
+        serial = EnsembleForecaster([m1, m2], weights).predict(self.X_test)
+        threaded = EnsembleForecaster([m1, m2], weights, n_jobs=2).predict(self.X_test)
+        np.testing.assert_allclose(threaded, serial)
+
     def test_sarima_basic(self):
         model = SARIMAForecaster(order=(1, 0, 0), seasonal_order=(0, 0, 0, 1))
         model.fit(self.X_train, self.y_train)
@@ -37,6 +37,7 @@ class CointegrationConfig:
     half_life_min: int = 5            # Min half-life
     min_correlation: float = 0.50     # Pre-filter: minimum correlation
     rescan_interval_days: int = 30    # Re-run cointegration scan
+    n_jobs: int = -1                  # Scan worker processes (-1 = all cores, 1 = serial)
 
 
 @dataclass
@@ -58,6 +59,7 @@ class KalmanConfig:
     observation_noise: float = 1.0    # Measurement noise
     initial_state_mean: float = 0.0
     initial_state_cov: float = 1.0
+    dtype: str = "float64"            # Kalman state storage precision ("float32" halves memory traffic)
 
 
 @dataclass
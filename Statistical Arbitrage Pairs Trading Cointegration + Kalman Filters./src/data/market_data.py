@@ -5,21 +5,13 @@ Generates synthetic cointegrated pairs for testing, or loads from CSV/database.
 
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Tuple, Optional
-from dataclasses import dataclass
+from scipy.signal import lfilter
+from typing import Dict, Tuple, Optional
 import structlog
 
 logger = structlog.get_logger()
 
 
-@dataclass
-class TickData:
-    symbol: str
-    timestamp: pd.Timestamp
-    price: float
-    volume: float
-
-
 class DataGenerator:
     """Generate synthetic cointegrated price series for testing."""
 
@@ -34,26 +26,37 @@ class DataGenerator:
         base_price_b: float = 120.0,
         noise_std: float = 0.5,
         seed: int = 42,
+        rng: Optional[np.random.Generator] = None,
     ) -> Tuple[pd.Series, pd.Series]:
-        """Generate a pair of cointegrated price series using OU process for spread."""
-        np.random.seed(seed)
+        """
+        Generate a pair of cointegrated price series using OU process for spread.
+
+        Draws come from ``rng`` when given, otherwise from a fresh
+        ``np.random.default_rng(seed)``.
+        """
+        if rng is None:
+            rng = np.random.default_rng(seed)
 
         # Generate mean-reverting spread (Ornstein-Uhlenbeck)
         theta = np.log(2) / half_life  # Mean-reversion speed
         dt = 1.0
-        spread = np.zeros(n_days)
-        spread[0] = spread_mean
 
-        for t in range(1, n_days):
-            dW = np.random.randn() * spread_std * np.sqrt(dt)
-            spread[t] = spread[t - 1] + theta * (spread_mean - spread[t - 1]) * dt + dW
+        # s[t] = (1 - theta*dt) * s[t-1] + theta*dt*mean + dW[t] is a first-order
+        # linear recursion, so it runs as an IIR filter seeded with s[0] = mean.
+        decay = 1.0 - theta * dt
+        dW = rng.standard_normal(n_days - 1) * spread_std * np.sqrt(dt)
+        spread = np.empty(n_days)
+        spread[0] = spread_mean
+        spread[1:], _ = lfilter(
+            [1.0], [1.0, -decay], dW + theta * spread_mean * dt, zi=[decay * spread_mean]
+        )
 
         # Generate asset A with random walk + drift
-        log_returns_a = np.random.randn(n_days) * 0.015 + 0.0002
+        log_returns_a = rng.standard_normal(n_days) * 0.015 + 0.0002
         prices_a = base_price_a * np.exp(np.cumsum(log_returns_a))
 
         # Generate asset B = beta * A + spread + noise
-        prices_b = beta * prices_a + spread + np.random.randn(n_days) * noise_std
+        prices_b = beta * prices_a + spread + rng.standard_normal(n_days) * noise_std
         prices_b = np.maximum(prices_b, 1.0)  # Floor at $1
         # Shift to target base price
         prices_b = prices_b * (base_price_b / prices_b[0])
@@ -70,12 +73,19 @@ class DataGenerator:
         n_noise: int = 20,
         n_days: int = 756,
         seed: int = 42,
+        dtype=np.float64,
     ) -> pd.DataFrame:
         """
         Generate a stock universe with n_pairs cointegrated pairs + n_noise random stocks.
         Returns DataFrame with columns as symbols, index as dates.
+
+        Pair parameters and noise stocks are drawn from one
+        ``default_rng(seed)``; each pair's series come from its own child
+        stream spawned from it, so pairs can be generated independently.
+        Series are generated in float64 and stored as ``dtype``.
         """
-        np.random.seed(seed)
+        rng = np.random.default_rng(seed)
+        pair_rngs = rng.spawn(n_pairs)
         all_prices = {}
         pair_registry = []
 
@@ -83,10 +93,10 @@ class DataGenerator:
             sym_a = f"CI_A{i:02d}"
             sym_b = f"CI_B{i:02d}"
 
-            half_life = np.random.uniform(8, 45)
-            beta = np.random.uniform(0.6, 1.8)
-            base_a = np.random.uniform(30, 300)
-            base_b = np.random.uniform(30, 300)
+            half_life = rng.uniform(8, 45)
+            beta = rng.uniform(0.6, 1.8)
+            base_a = rng.uniform(30, 300)
+            base_b = rng.uniform(30, 300)
 
             a, b = DataGenerator.generate_cointegrated_pair(
                 n_days=n_days,
@@ -94,7 +104,7 @@ class DataGenerator:
                 beta=beta,
                 base_price_a=base_a,
                 base_price_b=base_b,
-                seed=seed + i * 100,
+                rng=pair_rngs[i],
             )
 
             all_prices[sym_a] = a.values
@@ -104,13 +114,13 @@ class DataGenerator:
         # Random walk noise stocks (not cointegrated with anything)
         for i in range(n_noise):
             sym = f"RW_{i:02d}"
-            base = np.random.uniform(20, 400)
-            returns = np.random.randn(n_days) * 0.02 + 0.0001
+            base = rng.uniform(20, 400)
+            returns = rng.standard_normal(n_days) * 0.02 + 0.0001
             prices = base * np.exp(np.cumsum(returns))
             all_prices[sym] = prices
 
         dates = pd.bdate_range(start="2020-01-02", periods=n_days)
-        df = pd.DataFrame(all_prices, index=dates)
+        df = pd.DataFrame(all_prices, index=dates, dtype=dtype)
 
         logger.info(
             "universe_generated",
@@ -124,19 +134,39 @@ class DataGenerator:
 
     @staticmethod
     def simulate_tick_stream(
-        prices: pd.DataFrame, ticks_per_bar: int = 100
-    ) -> List[TickData]:
-        """Convert daily bars to simulated tick stream for latency testing."""
-        ticks = []
-        for date in prices.index:
-            for sym in prices.columns:
-                price = prices.loc[date, sym]
-                base_time = pd.Timestamp(date)
-                for t in range(ticks_per_bar):
-                    # Add intraday noise
-                    noise = np.random.randn() * price * 0.001
-                    tick_time = base_time + pd.Timedelta(seconds=t * (6.5 * 3600 / ticks_per_bar))
-                    ticks.append(
-                        TickData(sym, tick_time, price + noise, np.random.uniform(100, 10000))
-                    )
-        return ticks
+        prices: pd.DataFrame, ticks_per_bar: int = 100,
+        rng: Optional[np.random.Generator] = None,
+    ) -> pd.DataFrame:
+        """
+        Convert daily bars to simulated tick stream for latency testing.
+
+        Returns one row per tick (columns: symbol, timestamp, price, volume),
+        ordered by date, then symbol, then intraday tick.
+        """
+        if rng is None:
+            rng = np.random.default_rng()
+        n_dates, n_symbols = prices.shape
+        bar_prices = prices.to_numpy(dtype=np.float64)
+
+        # Add intraday noise: shape (date, symbol, tick)
+        noise = rng.standard_normal((n_dates, n_symbols, ticks_per_bar)) * bar_prices[:, :, None] * 0.001
+        tick_prices = bar_prices[:, :, None] + noise
+        volumes = rng.uniform(100, 10000, size=tick_prices.shape)
+
+        # Ticks spread evenly over the 6.5h session, as nanosecond offsets
+        step_ns = 6.5 * 3600 * 1e9 / ticks_per_bar
+        offsets_ns = np.rint(np.arange(ticks_per_bar) * step_ns).astype("timedelta64[ns]")
+        bar_times = pd.DatetimeIndex(prices.index).to_numpy().astype("datetime64[ns]")
+        tick_times = bar_times[:, None, None] + offsets_ns[None, None, :]
+        tick_times = np.broadcast_to(tick_times, tick_prices.shape)
+
+        symbols = np.broadcast_to(
+            np.asarray(prices.columns, dtype=object)[None, :, None], tick_prices.shape
+        )
+
+        return pd.DataFrame({
+            "symbol": symbols.ravel(),
+            "timestamp": tick_times.ravel(),
+            "price": tick_prices.ravel(),
+            "volume": volumes.ravel(),
+        })
@@ -15,7 +15,7 @@ from src.signals.signal_generator import TradingSignal, SignalType
 logger = structlog.get_logger()
 
 
-@dataclass
+@dataclass(slots=True)
 class PairPosition:
     pair_id: str
     symbol_a: str
@@ -28,11 +28,12 @@ class PairPosition:
     entry_spread: float = 0.0
     entry_zscore: float = 0.0
     entry_time: Optional[pd.Timestamp] = None
+    entry_bar_idx: Optional[int] = None  # Backtest bar the position was opened on
     direction: str = ""  # "long_spread" or "short_spread"
     unrealized_pnl: float = 0.0
 
 
-@dataclass
+@dataclass(slots=True)
 class TradeRecord:
     pair_id: str
     symbol_a: str
@@ -50,7 +51,7 @@ class TradeRecord:
     exit_reason: str  # "mean_reversion", "stop_loss"
 
 
-@dataclass
+@dataclass(slots=True)
 class PortfolioSnapshot:
     timestamp: pd.Timestamp
     equity: float
@@ -62,6 +63,96 @@ class PortfolioSnapshot:
     n_trades_today: int
 
 
+class SnapshotColumns:
+    """
+    Portfolio snapshots stored column-wise: one NumPy buffer per
+    PortfolioSnapshot field, appended by index and doubled when full.
+    Column properties return views over the recorded rows.
+    """
+
+    _FIELDS = ("timestamp", "equity", "cash", "positions_value",
+               "daily_return", "drawdown", "n_positions")
+
+    def __init__(self, capacity: int = 256):
+        self._timestamp = np.empty(capacity, dtype=object)
+        self._equity = np.empty(capacity)
+        self._cash = np.empty(capacity)
+        self._positions_value = np.empty(capacity)
+        self._daily_return = np.empty(capacity)
+        self._drawdown = np.empty(capacity)
+        self._n_positions = np.empty(capacity, dtype=np.int64)
+        self._n = 0
+
+    def __len__(self) -> int:
+        return self._n
+
+    def append(
+        self, timestamp: pd.Timestamp, equity: float, cash: float, positions_value: float,
+        daily_return: float, drawdown: float, n_positions: int,
+    ):
+        i = self._n
+        if i == len(self._equity):
+            self._grow()
+        self._timestamp[i] = timestamp
+        self._equity[i] = equity
+        self._cash[i] = cash
+        self._positions_value[i] = positions_value
+        self._daily_return[i] = daily_return
+        self._drawdown[i] = drawdown
+        self._n_positions[i] = n_positions
+        self._n = i + 1
+
+    def _grow(self):
+        """Double every buffer, keeping what has been recorded."""
+        for name in self._FIELDS:
+            old = getattr(self, "_" + name)
+            new = np.empty(max(2 * len(old), 1), dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, "_" + name, new)
+
+    @property
+    def timestamp(self) -> np.ndarray:
+        return self._timestamp[:self._n]
+
+    @property
+    def equity(self) -> np.ndarray:
+        return self._equity[:self._n]
+
+    @property
+    def cash(self) -> np.ndarray:
+        return self._cash[:self._n]
+
+    @property
+    def positions_value(self) -> np.ndarray:
+        return self._positions_value[:self._n]
+
+    @property
+    def daily_return(self) -> np.ndarray:
+        return self._daily_return[:self._n]
+
+    @property
+    def drawdown(self) -> np.ndarray:
+        return self._drawdown[:self._n]
+
+    @property
+    def n_positions(self) -> np.ndarray:
+        return self._n_positions[:self._n]
+
+    def to_list(self) -> List[PortfolioSnapshot]:
+        """Materialize the rows as PortfolioSnapshot objects."""
+        return [
+            PortfolioSnapshot(
+                timestamp=ts, equity=eq, cash=cash, positions_value=pv,
+                daily_return=ret, drawdown=dd, n_positions=n_pos, n_trades_today=0,
+            )
+            for ts, eq, cash, pv, ret, dd, n_pos in zip(
+                self.timestamp, self.equity.tolist(), self.cash.tolist(),
+                self.positions_value.tolist(), self.daily_return.tolist(),
+                self.drawdown.tolist(), self.n_positions.tolist(),
+            )
+        ]
+
+
 class ExecutionEngine:
     """Manages order execution, position tracking, and portfolio state."""
 
@@ -69,37 +160,74 @@ class ExecutionEngine:
         self.cfg = cfg or config.trading
         self.cash = self.cfg.initial_capital
         self.initial_capital = self.cfg.initial_capital
-        self.positions: Dict[str, PairPosition] = {}
+        self._positions: Dict[str, PairPosition] = {}
         self.trades: List[TradeRecord] = []
-        self.snapshots: List[PortfolioSnapshot] = []
         self._peak_equity = self.cfg.initial_capital
         self._prev_equity = self.cfg.initial_capital
 
+        # Run-constant cost/risk parameters, resolved once
+        self._slip_frac = self.cfg.slippage_bps * 1e-4
+        self._comm_frac = self.cfg.commission_bps * 1e-4
+        self._max_pos_pct = self.cfg.max_position_pct
+        self._max_active = self.cfg.max_pairs_active
+
+        # Open positions as parallel arrays (slot order = self._book) so
+        # mark-to-market is a single vector expression.
+        self._book: List[PairPosition] = []
+        self._qty_a = np.empty(0)
+        self._qty_b = np.empty(0)
+        self._entry_a = np.empty(0)
+        self._entry_b = np.empty(0)
+        self._upnl = np.empty(0)
+        self._a_idx: Optional[np.ndarray] = None   # Column indices cached per col_idx map
+        self._b_idx: Optional[np.ndarray] = None
+        self._idx_map: Optional[Dict[str, int]] = None
+
+        # Snapshot columns, appended on every mark (see prealloc_snapshots)
+        self.prealloc_snapshots(256)
+
+    def prealloc_snapshots(self, n: int):
+        """
+        Size the snapshot buffers for ``n`` marks (e.g. the number of test bars).
+        Marks past the capacity still work; the buffers double as needed.
+        Discards any snapshots recorded so far.
+        """
+        self.snapshot_columns = SnapshotColumns(n)
+        self._snap_list: Optional[List[PortfolioSnapshot]] = None
+
     def execute_signal(
-        self, signal: TradingSignal, price_a: float, price_b: float
+        self, signal: TradingSignal, price_a: float, price_b: float,
+        bar_idx: Optional[int] = None,
     ) -> Optional[TradeRecord]:
-        """Execute a trading signal. Returns TradeRecord if a position was closed."""
+        """
+        Execute a trading signal. Returns TradeRecord if a position was closed.
+
+        bar_idx is the backtest bar the signal fired on; when given for both
+        the open and the close, holding_days counts bars instead of calendar
+        days between the timestamps.
+        """
         if signal.signal_type == SignalType.HOLD:
             return None
 
         if signal.signal_type in (SignalType.ENTER_LONG, SignalType.ENTER_SHORT):
-            return self._open_position(signal, price_a, price_b)
+            return self._open_position(signal, price_a, price_b, bar_idx)
         elif signal.signal_type in (SignalType.EXIT, SignalType.STOP_LOSS):
-            return self._close_position(signal, price_a, price_b)
+            return self._close_position(signal, price_a, price_b, bar_idx)
 
         return None
 
     def _open_position(
-        self, signal: TradingSignal, price_a: float, price_b: float
+        self, signal: TradingSignal, price_a: float, price_b: float,
+        bar_idx: Optional[int] = None,
     ) -> None:
         """Open a new pairs position."""
-        if signal.pair_id in self.positions:
+        if signal.pair_id in self._positions:
             return None  # Already have position
-        if len(self.positions) >= self.cfg.max_pairs_active:
+        if len(self._positions) >= self._max_active:
             return None  # At capacity
 
         equity = self._current_equity({})
-        notional = equity * self.cfg.max_position_pct
+        notional = equity * self._max_pos_pct
         hedge = abs(signal.hedge_ratio)
 
         # Size: equal dollar exposure on each leg
@@ -110,10 +238,12 @@ class ExecutionEngine:
             return None
 
         # Apply slippage
-        slip_a = price_a * self.cfg.slippage_bps / 10000
-        slip_b = price_b * self.cfg.slippage_bps / 10000
-        comm_a = price_a * qty_a * self.cfg.commission_bps / 10000
-        comm_b = price_b * qty_b * self.cfg.commission_bps / 10000
+        slip_frac = self._slip_frac
+        comm_frac = self._comm_frac
+        slip_a = price_a * slip_frac
+        slip_b = price_b * slip_frac
+        comm_a = price_a * qty_a * comm_frac
+        comm_b = price_b * qty_b * comm_frac
 
         direction = "long_spread" if signal.signal_type == SignalType.ENTER_LONG else "short_spread"
 
@@ -138,46 +268,58 @@ class ExecutionEngine:
                 entry_zscore=signal.zscore, entry_time=signal.timestamp, direction=direction,
             )
 
+        pos.entry_bar_idx = bar_idx
         self.cash -= cost
-        self.positions[signal.pair_id] = pos
+        self._positions[signal.pair_id] = pos
+        self._book.append(pos)
+        self._rebuild_book(np.append(self._upnl, 0.0))
         logger.info("position_opened", pair=signal.pair_id, direction=direction,
                      z=f"{signal.zscore:.2f}", qty_a=pos.qty_a, qty_b=pos.qty_b)
         return None
 
     def _close_position(
-        self, signal: TradingSignal, price_a: float, price_b: float
+        self, signal: TradingSignal, price_a: float, price_b: float,
+        bar_idx: Optional[int] = None,
     ) -> Optional[TradeRecord]:
         """Close an existing pairs position."""
-        pos = self.positions.pop(signal.pair_id, None)
+        pos = self._positions.pop(signal.pair_id, None)
         if pos is None:
             return None
+        slot = self._book.index(pos)
+        del self._book[slot]
+        self._rebuild_book(np.delete(self._upnl, slot))
 
-        slip_a = price_a * self.cfg.slippage_bps / 10000
-        slip_b = price_b * self.cfg.slippage_bps / 10000
-        comm = (abs(pos.qty_a) * price_a + abs(pos.qty_b) * price_b) * self.cfg.commission_bps / 10000
+        abs_qty_a = abs(pos.qty_a)
+        abs_qty_b = abs(pos.qty_b)
+        slip_a = price_a * self._slip_frac
+        slip_b = price_b * self._slip_frac
+        comm = (abs_qty_a * price_a + abs_qty_b * price_b) * self._comm_frac
 
         # P&L from closing
         if pos.qty_a > 0:
             pnl_a = pos.qty_a * ((price_a - slip_a) - pos.entry_price_a)
         else:
-            pnl_a = abs(pos.qty_a) * (pos.entry_price_a - (price_a + slip_a))
+            pnl_a = abs_qty_a * (pos.entry_price_a - (price_a + slip_a))
 
         if pos.qty_b > 0:
             pnl_b = pos.qty_b * ((price_b - slip_b) - pos.entry_price_b)
         else:
-            pnl_b = abs(pos.qty_b) * (pos.entry_price_b - (price_b + slip_b))
+            pnl_b = abs_qty_b * (pos.entry_price_b - (price_b + slip_b))
 
         total_pnl = pnl_a + pnl_b - comm
         self.cash += total_pnl
 
         # Also return capital from closed positions
-        notional_closed = abs(pos.qty_a) * price_a + abs(pos.qty_b) * price_b
+        notional_closed = abs_qty_a * price_a + abs_qty_b * price_b
         self.cash += notional_closed / 2  # Approximate
 
-        entry_notional = abs(pos.qty_a) * pos.entry_price_a + abs(pos.qty_b) * pos.entry_price_b
+        entry_notional = abs_qty_a * pos.entry_price_a + abs_qty_b * pos.entry_price_b
         return_pct = total_pnl / (entry_notional + 1e-10)
 
-        holding = (signal.timestamp - pos.entry_time).days if pos.entry_time else 0
+        if bar_idx is not None and pos.entry_bar_idx is not None:
+            holding = bar_idx - pos.entry_bar_idx
+        else:
+            holding = (signal.timestamp - pos.entry_time).days if pos.entry_time else 0
         exit_reason = "stop_loss" if signal.signal_type == SignalType.STOP_LOSS else "mean_reversion"
 
         trade = TradeRecord(
@@ -196,36 +338,87 @@ class ExecutionEngine:
         self, prices: Dict[str, float], timestamp: pd.Timestamp
     ) -> PortfolioSnapshot:
         """Mark all positions and record portfolio snapshot."""
-        pos_value = 0.0
-        for pos in self.positions.values():
-            pa = prices.get(pos.symbol_a, pos.entry_price_a)
-            pb = prices.get(pos.symbol_b, pos.entry_price_b)
-            pos.unrealized_pnl = (
-                pos.qty_a * (pa - pos.entry_price_a) + pos.qty_b * (pb - pos.entry_price_b)
-            )
-            pos_value += pos.unrealized_pnl
+        if not self._book:
+            return self._mark(None, None, timestamp)
+        pa = np.array([prices.get(p.symbol_a, p.entry_price_a) for p in self._book], dtype=np.float64)
+        pb = np.array([prices.get(p.symbol_b, p.entry_price_b) for p in self._book], dtype=np.float64)
+        return self._mark(pa, pb, timestamp)
+
+    def mark_to_market_vec(
+        self, price_row: np.ndarray, col_idx: Dict[str, int], timestamp: pd.Timestamp
+    ) -> PortfolioSnapshot:
+        """
+        Mark all positions from one row of a price matrix.
+
+        Args:
+            price_row: Prices for every symbol, laid out as in col_idx
+            col_idx: Symbol -> column position in price_row
+        """
+        if not self._book:
+            return self._mark(None, None, timestamp)
+        # Compared by contents, so a col_idx remapped in place is picked up
+        if self._idx_map != col_idx:
+            self._idx_map = dict(col_idx)
+            self._a_idx = np.array([col_idx[p.symbol_a] for p in self._book], dtype=np.intp)
+            self._b_idx = np.array([col_idx[p.symbol_b] for p in self._book], dtype=np.intp)
+        return self._mark(price_row[self._a_idx], price_row[self._b_idx], timestamp)
+
+    def _mark(
+        self, pa: Optional[np.ndarray], pb: Optional[np.ndarray], timestamp: pd.Timestamp
+    ) -> PortfolioSnapshot:
+        if self._book:
+            self._upnl = self._qty_a * (pa - self._entry_a) + self._qty_b * (pb - self._entry_b)
+            pos_value = float(self._upnl.sum())
+        else:
+            # Flat book: nothing to mark, skip the array arithmetic
+            pos_value = 0.0
 
         equity = self.cash + pos_value
         daily_ret = (equity / self._prev_equity - 1) if self._prev_equity > 0 else 0
         self._peak_equity = max(self._peak_equity, equity)
         dd = 1 - equity / self._peak_equity if self._peak_equity > 0 else 0
 
-        snap = PortfolioSnapshot(
-            timestamp=timestamp, equity=equity, cash=self.cash, positions_value=pos_value,
-            daily_return=daily_ret, drawdown=dd, n_positions=len(self.positions), n_trades_today=0,
+        self.snapshot_columns.append(
+            timestamp, equity, self.cash, pos_value, daily_ret, dd, len(self._book)
         )
-        self.snapshots.append(snap)
+        self._snap_list = None
         self._prev_equity = equity
-        return snap
 
-    def _current_equity(self, prices: Dict[str, float]) -> float:
-        return self.cash + sum(
-            p.unrealized_pnl for p in self.positions.values()
+        return PortfolioSnapshot(
+            timestamp=timestamp, equity=equity, cash=self.cash, positions_value=pos_value,
+            daily_return=daily_ret, drawdown=dd, n_positions=len(self._book), n_trades_today=0,
         )
 
+    def _rebuild_book(self, upnl: np.ndarray):
+        """Refresh the position arrays after an open/close."""
+        self._qty_a = np.array([p.qty_a for p in self._book], dtype=np.float64)
+        self._qty_b = np.array([p.qty_b for p in self._book], dtype=np.float64)
+        self._entry_a = np.array([p.entry_price_a for p in self._book], dtype=np.float64)
+        self._entry_b = np.array([p.entry_price_b for p in self._book], dtype=np.float64)
+        self._upnl = upnl
+        self._idx_map = None
+
+    def _current_equity(self, prices: Dict[str, float]) -> float:
+        return self.cash + float(self._upnl.sum())
+
+    @property
+    def positions(self) -> Dict[str, PairPosition]:
+        """Open positions by pair_id, with unrealized P&L as of the last mark."""
+        for pos, upnl in zip(self._book, self._upnl.tolist()):
+            pos.unrealized_pnl = upnl
+        return self._positions
+
+    @property
+    def snapshots(self) -> List[PortfolioSnapshot]:
+        """Recorded snapshots as objects, materialized from snapshot_columns on first access."""
+        if self._snap_list is None:
+            self._snap_list = self.snapshot_columns.to_list()
+        return self._snap_list
+
     @property
     def equity(self) -> float:
-        return self.snapshots[-1].equity if self.snapshots else self.initial_capital
+        cols = self.snapshot_columns
+        return float(cols.equity[-1]) if len(cols) else self.initial_capital
 
     @property
     def total_pnl(self) -> float:
@@ -5,27 +5,128 @@ under changing market regimes.
 """
 
 import numpy as np
-from dataclasses import dataclass, field
-from typing import Tuple
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 import structlog
 
 from src.config import config
+from src.utils.jit import njit
 
 logger = structlog.get_logger()
 
 
-@dataclass
+@njit(cache=True, fastmath=True)
+def _kalman_step(
+    intercept: float, beta: float, P00: float, P01: float, P11: float, R: float,
+    q: float, price_a: float, price_b: float,
+) -> Tuple[float, float, float, float, float, float, float, float]:
+    """
+    One predict/update cycle of the 2-state hedge-ratio filter.
+
+    Returns (intercept, beta, P00, P01, P11, R, innovation, S).
+    """
+    # Prediction step (random walk state transition: F = I, P_pred = P + Q)
+    P00 = P00 + q
+    P11 = P11 + q
+
+    # Innovation (measurement residual), H = [1, price_b]
+    innovation = price_a - (intercept + beta * price_b)
+
+    # Innovation covariance S = H P_pred H' + R and P_pred H'
+    h0 = P00 + price_b * P01
+    h1 = P01 + price_b * P11
+    S = h0 + price_b * h1 + R
+
+    # Kalman gain
+    K0 = h0 / S
+    K1 = h1 / S
+
+    # Update step: x += K * innovation, P = (I - K H) P_pred
+    intercept = intercept + K0 * innovation
+    beta = beta + K1 * innovation
+    P00_new = P00 - K0 * h0
+    P01_new = P01 - K0 * h1
+    P11_new = P11 - K1 * h1
+
+    # Update observation noise estimate (adaptive R)
+    R = max(0.5 * R + 0.5 * innovation * innovation, 1e-6)
+
+    return intercept, beta, P00_new, P01_new, P11_new, R, innovation, S
+
+
+@njit(cache=True)
+def _kalman_step_batch(
+    intercept, beta, P00, P01, P11, R, spread, spread_var, n_updates,
+    q, price_a, price_b,
+):
+    """
+    In-place _kalman_step over state arrays; pairs with a NaN price are skipped.
+
+    Each step is computed in float64 and stored back in the arrays' dtype.
+    """
+    for i in range(price_a.shape[0]):
+        pa = price_a[i]
+        pb = price_b[i]
+        if np.isnan(pa) or np.isnan(pb):
+            continue
+        (
+            intercept[i], beta[i], P00[i], P01[i], P11[i], R[i],
+            spread[i], spread_var[i],
+        ) = _kalman_step(
+            np.float64(intercept[i]), np.float64(beta[i]), np.float64(P00[i]),
+            np.float64(P01[i]), np.float64(P11[i]), np.float64(R[i]),
+            q, np.float64(pa), np.float64(pb),
+        )
+        n_updates[i] += 1
+
+
+@njit(cache=True)
+def _kalman_step_slots(
+    slots, intercept, beta, P00, P01, P11, R, spread, spread_var, n_updates,
+    q, price_a, price_b,
+):
+    """_kalman_step_batch for the pairs in slots only; price_k belongs to slots[k]."""
+    for k in range(slots.shape[0]):
+        i = slots[k]
+        pa = price_a[k]
+        pb = price_b[k]
+        if np.isnan(pa) or np.isnan(pb):
+            continue
+        (
+            intercept[i], beta[i], P00[i], P01[i], P11[i], R[i],
+            spread[i], spread_var[i],
+        ) = _kalman_step(
+            np.float64(intercept[i]), np.float64(beta[i]), np.float64(P00[i]),
+            np.float64(P01[i]), np.float64(P11[i]), np.float64(R[i]),
+            q, np.float64(pa), np.float64(pb),
+        )
+        n_updates[i] += 1
+
+
+@dataclass(slots=True)
 class KalmanState:
     """State of the Kalman filter at time t."""
     beta: float              # Current hedge ratio estimate
     intercept: float         # Current intercept estimate
-    P: np.ndarray            # 2x2 state covariance matrix
+    P00: float               # State covariance (symmetric 2x2): var(intercept)
+    P01: float               #   cov(intercept, beta)
+    P11: float               #   var(beta)
     R: float                 # Observation noise variance (estimated)
-    Q: np.ndarray            # 2x2 process noise covariance
+    q: float                 # Process noise variance (Q = q * I)
     spread: float = 0.0      # Current spread residual
     spread_var: float = 1.0  # Spread variance
     n_updates: int = 0
 
+    @property
+    def P(self) -> np.ndarray:
+        """2x2 state covariance matrix."""
+        return np.array([[self.P00, self.P01], [self.P01, self.P11]])
+
+    @property
+    def Q(self) -> np.ndarray:
+        """2x2 process noise covariance."""
+        return np.eye(2) * self.q
+
 
 class KalmanHedgeRatio:
     """
@@ -36,24 +137,30 @@ class KalmanHedgeRatio:
 
     The filter adapts the hedge ratio over time, capturing regime changes
     that a static OLS regression would miss.
+
+    The 2-state filter is small enough that the matrix algebra is written out
+    as scalar arithmetic on the three unique covariance entries; KalmanState
+    snapshots are only built when a caller asks for one.
     """
 
     def __init__(self, cfg=None):
         self.cfg = cfg or config.kalman
-        self._state = None
+        self._initialized = False
 
     def initialize(self, initial_beta: float = 1.0) -> KalmanState:
         """Initialize filter with prior estimate of hedge ratio."""
-        P = np.eye(2) * self.cfg.initial_state_cov
-        Q = np.eye(2) * self.cfg.delta
-        self._state = KalmanState(
-            beta=initial_beta,
-            intercept=0.0,
-            P=P,
-            R=self.cfg.observation_noise,
-            Q=Q,
-        )
-        return self._state
+        self._beta = float(initial_beta)
+        self._intercept = 0.0
+        self._P00 = float(self.cfg.initial_state_cov)
+        self._P01 = 0.0
+        self._P11 = float(self.cfg.initial_state_cov)
+        self._R = float(self.cfg.observation_noise)
+        self._q = float(self.cfg.delta)
+        self._spread = 0.0
+        self._spread_var = 1.0
+        self._n_updates = 0
+        self._initialized = True
+        return self.state
 
     def update(self, price_a: float, price_b: float) -> KalmanState:
         """
@@ -66,108 +173,276 @@ class KalmanHedgeRatio:
         Returns:
             Updated KalmanState with new beta, spread, and covariance
         """
-        if self._state is None:
+        if not self._initialized:
             self.initialize()
 
-        state = self._state
-
-        # State vector: x = [intercept, beta]
-        x = np.array([state.intercept, state.beta])
-
-        # Observation matrix: H = [1, price_b]
-        H = np.array([1.0, price_b])
-
-        # Prediction step
-        # x_pred = x (random walk state transition: F = I)
-        P_pred = state.P + state.Q
-
-        # Innovation (measurement residual)
-        y_pred = H @ x  # predicted price_a
-        innovation = price_a - y_pred
-
-        # Innovation covariance
-        S = H @ P_pred @ H.T + state.R
-
-        # Kalman gain
-        K = P_pred @ H.T / S
-
-        # Update step
-        x_new = x + K * innovation
-        P_new = (np.eye(2) - np.outer(K, H)) @ P_pred
-
-        # Update observation noise estimate (adaptive R)
-        state.R = max(0.5 * state.R + 0.5 * innovation ** 2, 1e-6)
+        (
+            self._intercept, self._beta, self._P00, self._P01, self._P11, self._R,
+            innovation, S,
+        ) = _kalman_step(
+            self._intercept, self._beta, self._P00, self._P01, self._P11, self._R,
+            self._q, price_a, price_b,
+        )
 
-        # Store state
-        state.intercept = float(x_new[0])
-        state.beta = float(x_new[1])
-        state.P = P_new
-        state.spread = float(innovation)
-        state.spread_var = float(S)
-        state.n_updates += 1
+        self._spread = float(innovation)
+        self._spread_var = float(S)
+        self._n_updates += 1
 
-        return state
+        return self.state
 
     def get_spread(self, price_a: float, price_b: float) -> float:
         """Compute spread using current Kalman hedge ratio."""
-        if self._state is None:
+        if not self._initialized:
             return 0.0
-        return price_a - self._state.intercept - self._state.beta * price_b
+        return price_a - self._intercept - self._beta * price_b
 
     def get_zscore(self, price_a: float, price_b: float) -> float:
         """Compute z-score of spread using Kalman-estimated variance."""
-        if self._state is None or self._state.spread_var <= 0:
+        if not self._initialized or self._spread_var <= 0:
             return 0.0
         spread = self.get_spread(price_a, price_b)
-        return spread / np.sqrt(self._state.spread_var)
+        return spread / np.sqrt(self._spread_var)
 
     @property
-    def state(self) -> KalmanState:
-        return self._state
+    def state(self) -> Optional[KalmanState]:
+        if not self._initialized:
+            return None
+        return KalmanState(
+            beta=self._beta,
+            intercept=self._intercept,
+            P00=self._P00,
+            P01=self._P01,
+            P11=self._P11,
+            R=self._R,
+            q=self._q,
+            spread=self._spread,
+            spread_var=self._spread_var,
+            n_updates=self._n_updates,
+        )
 
     @property
     def hedge_ratio(self) -> float:
-        return self._state.beta if self._state else 1.0
+        return self._beta if self._initialized else 1.0
 
     def reset(self):
         """Reset filter state."""
-        self._state = None
+        self._initialized = False
 
 
 class KalmanPairTracker:
-    """Manages Kalman filters for multiple pairs simultaneously."""
+    """
+    Manages Kalman filters for multiple pairs simultaneously.
+
+    Filter state is stored structure-of-arrays: one NumPy array per state
+    variable, indexed by the pair's slot (insertion order). update_all() steps
+    every pair in one compiled loop instead of one Python method call per pair.
+    The float state arrays use cfg.dtype; the step itself computes in float64.
+    """
+
+    # Per-pair state arrays, in the order used by add_pair/update_all
+    _FIELDS = (
+        "_intercept", "_beta", "_P00", "_P01", "_P11", "_R",
+        "_spread", "_spread_var", "_n_updates",
+    )
 
     def __init__(self, cfg=None):
         self.cfg = cfg or config.kalman
-        self._filters = {}
+        self._index: Dict[str, int] = {}
+        self._pair_ids: List[str] = []
+        dtype = np.dtype(self.cfg.dtype)
+        self._intercept = np.empty(0, dtype=dtype)
+        self._beta = np.empty(0, dtype=dtype)
+        self._P00 = np.empty(0, dtype=dtype)
+        self._P01 = np.empty(0, dtype=dtype)
+        self._P11 = np.empty(0, dtype=dtype)
+        self._R = np.empty(0, dtype=dtype)
+        self._spread = np.empty(0, dtype=dtype)
+        self._spread_var = np.empty(0, dtype=dtype)
+        self._n_updates = np.empty(0, dtype=np.int64)
 
     def add_pair(self, pair_id: str, initial_beta: float = 1.0):
         """Initialize a Kalman filter for a new pair."""
-        kf = KalmanHedgeRatio(self.cfg)
-        kf.initialize(initial_beta)
-        self._filters[pair_id] = kf
+        values = (
+            0.0, initial_beta, self.cfg.initial_state_cov, 0.0,
+            self.cfg.initial_state_cov, self.cfg.observation_noise, 0.0, 1.0, 0,
+        )
+        idx = self._index.get(pair_id)
+        if idx is None:
+            self._index[pair_id] = len(self._pair_ids)
+            self._pair_ids.append(pair_id)
+            for name, value in zip(self._FIELDS, values):
+                arr = getattr(self, name)
+                setattr(self, name, np.append(arr, np.array(value, dtype=arr.dtype)))
+        else:
+            for name, value in zip(self._FIELDS, values):
+                getattr(self, name)[idx] = value
 
     def update(self, pair_id: str, price_a: float, price_b: float) -> KalmanState:
         """Update the filter for a specific pair."""
-        if pair_id not in self._filters:
+        if pair_id not in self._index:
             self.add_pair(pair_id)
-        return self._filters[pair_id].update(price_a, price_b)
+        i = self._index[pair_id]
+        self.update_slot(i, price_a, price_b)
+        return self._state_at(i)
+
+    def update_slot(self, i: int, price_a: float, price_b: float) -> None:
+        """Update the filter in slot i (the pair's position in pair_ids)."""
+        (
+            intercept, beta, P00, P01, P11, R, innovation, S,
+        ) = _kalman_step(
+            float(self._intercept[i]), float(self._beta[i]), float(self._P00[i]),
+            float(self._P01[i]), float(self._P11[i]), float(self._R[i]),
+            self.cfg.delta, price_a, price_b,
+        )
+        self._intercept[i] = intercept
+        self._beta[i] = beta
+        self._P00[i] = P00
+        self._P01[i] = P01
+        self._P11[i] = P11
+        self._R[i] = R
+        self._spread[i] = innovation
+        self._spread_var[i] = S
+        self._n_updates[i] += 1
+
+    def update_all(self, price_a: np.ndarray, price_b: np.ndarray) -> None:
+        """
+        Update every tracked pair with one observation each.
+
+        Args:
+            price_a: Prices of asset A, aligned with pair_ids
+            price_b: Prices of asset B, aligned with pair_ids
+
+        Pairs with a NaN price are left untouched.
+
+        Raises:
+            ValueError: If the price arrays are not one per tracked pair
+        """
+        price_a = np.ascontiguousarray(price_a, dtype=np.float64)
+        price_b = np.ascontiguousarray(price_b, dtype=np.float64)
+        n = len(self._pair_ids)
+        if price_a.shape != (n,) or price_b.shape != (n,):
+            raise ValueError(
+                f"price arrays {price_a.shape} and {price_b.shape} "
+                f"do not match {n} tracked pairs"
+            )
+        # The compiled kernel does no bounds checking, hence the check above
+        _kalman_step_batch(
+            self._intercept, self._beta, self._P00, self._P01, self._P11, self._R,
+            self._spread, self._spread_var, self._n_updates, float(self.cfg.delta),
+            price_a, price_b,
+        )
+
+    def update_batch(
+        self, ids: Union[Sequence[str], np.ndarray], price_a: np.ndarray, price_b: np.ndarray
+    ) -> None:
+        """
+        Update a subset of pairs in one compiled loop.
+
+        Args:
+            ids: Pair ids, or an integer array of slots (positions in pair_ids)
+            price_a: Prices of asset A, aligned with ids
+            price_b: Prices of asset B, aligned with ids
+
+        Unknown pair ids are added first, as in update(). Pairs with a NaN
+        price are left untouched; a pair listed twice is updated twice, in order.
+
+        Raises:
+            ValueError: If slots are not 1-D or the price arrays do not match them
+            IndexError: If a slot is outside the tracked pairs
+        """
+        if isinstance(ids, np.ndarray) and ids.dtype.kind in "iu":
+            slots = ids.astype(np.intp, copy=False)
+            if slots.ndim != 1:
+                raise ValueError(f"slots must be 1-D, got shape {slots.shape}")
+            if slots.size and (slots.min() < 0 or slots.max() >= len(self._pair_ids)):
+                raise IndexError(
+                    f"slots must lie in [0, {len(self._pair_ids)}), "
+                    f"got [{slots.min()}, {slots.max()}]"
+                )
+        else:
+            for pair_id in ids:
+                if pair_id not in self._index:
+                    self.add_pair(pair_id)
+            slots = np.fromiter((self._index[pid] for pid in ids), dtype=np.intp, count=len(ids))
+        price_a = np.ascontiguousarray(price_a, dtype=np.float64)
+        price_b = np.ascontiguousarray(price_b, dtype=np.float64)
+        if price_a.shape != slots.shape or price_b.shape != slots.shape:
+            raise ValueError(
+                f"price arrays {price_a.shape} and {price_b.shape} "
+                f"do not match {len(slots)} pairs"
+            )
+        # The compiled kernel does no bounds checking, hence the checks above
+        _kalman_step_slots(
+            slots, self._intercept, self._beta, self._P00, self._P01, self._P11, self._R,
+            self._spread, self._spread_var, self._n_updates, float(self.cfg.delta),
+            price_a, price_b,
+        )
+
+    def zscores(self, price_a: np.ndarray, price_b: np.ndarray) -> np.ndarray:
+        """Vectorized get_zscore across all tracked pairs."""
+        spread = price_a - self._intercept - self._beta * price_b
+        var = self._spread_var
+        with np.errstate(invalid="ignore", divide="ignore"):
+            z = spread / np.sqrt(var)
+        return np.where(var > 0, z, 0.0)
 
     def get_zscore(self, pair_id: str, price_a: float, price_b: float) -> float:
         """Get current z-score for a pair."""
-        if pair_id not in self._filters:
+        i = self._index.get(pair_id)
+        if i is None:
+            return 0.0
+        return self.zscore_slot(i, price_a, price_b)
+
+    def zscore_slot(self, i: int, price_a: float, price_b: float) -> float:
+        """get_zscore for the pair in slot i."""
+        if self._spread_var[i] <= 0:
             return 0.0
-        return self._filters[pair_id].get_zscore(price_a, price_b)
+        spread = price_a - self._intercept[i] - self._beta[i] * price_b
+        return float(spread / np.sqrt(self._spread_var[i]))
 
     def get_hedge_ratio(self, pair_id: str) -> float:
         """Get current hedge ratio for a pair."""
-        if pair_id not in self._filters:
+        i = self._index.get(pair_id)
+        if i is None:
             return 1.0
-        return self._filters[pair_id].hedge_ratio
+        return float(self._beta[i])
 
     def remove_pair(self, pair_id: str):
-        self._filters.pop(pair_id, None)
+        i = self._index.pop(pair_id, None)
+        if i is None:
+            return
+        del self._pair_ids[i]
+        for name in self._FIELDS:
+            setattr(self, name, np.delete(getattr(self, name), i))
+        self._index = {pid: j for j, pid in enumerate(self._pair_ids)}
+
+    def _state_at(self, i: int) -> KalmanState:
+        return KalmanState(
+            beta=float(self._beta[i]),
+            intercept=float(self._intercept[i]),
+            P00=float(self._P00[i]),
+            P01=float(self._P01[i]),
+            P11=float(self._P11[i]),
+            R=float(self._R[i]),
+            q=self.cfg.delta,
+            spread=float(self._spread[i]),
+            spread_var=float(self._spread_var[i]),
+            n_updates=int(self._n_updates[i]),
+        )
+
+    @property
+    def pair_ids(self) -> List[str]:
+        """Pair ids in slot order (the layout expected by update_all)."""
+        return list(self._pair_ids)
+
+    @property
+    def hedge_ratios(self) -> np.ndarray:
+        return self._beta
+
+    @property
+    def spreads(self) -> np.ndarray:
+        return self._spread
 
     @property
     def active_pairs(self) -> int:
-        return len(self._filters)
+        return len(self._pair_ids)
@@ -10,6 +10,7 @@ Workflow:
 """
 
 import time
+from operator import attrgetter
 import numpy as np
 import pandas as pd
 import structlog
@@ -82,8 +83,9 @@ class PairsTradingPipeline:
 
         # --- Step 4: Run backtest on test data ---
         logger.info("running_backtest")
-        signal_gen = SignalGenerator(pairs, self.cfg.trading)
+        signal_gen = SignalGenerator(pairs, self.cfg.trading, self.cfg.kalman)
         executor = ExecutionEngine(self.cfg.trading)
+        executor.prealloc_snapshots(len(test_prices))
         monitor = MonitoringService(
             self.cfg.monitoring.alert_latency_ms,
             self.cfg.monitoring.alert_drawdown_pct,
@@ -93,40 +95,44 @@ class PairsTradingPipeline:
         ticks_processed = 0
         bt_start = time.perf_counter()
 
+        # Iterate bars by integer position over one contiguous float64 price
+        # matrix. Fills and P&L read it directly; cfg.kalman.dtype only sets
+        # the Kalman tracker's state storage.
+        price_arr = test_prices.to_numpy(dtype=np.float64)
+        col_idx = {sym: j for j, sym in enumerate(test_prices.columns)}
+
         for i, date in enumerate(test_prices.index):
-            row_prices = {}
-            for sym in test_prices.columns:
-                row_prices[sym] = test_prices.loc[date, sym]
+            row = price_arr[i]
 
             # Generate signals for all pairs
-            signals = signal_gen.process_bar(test_prices, date)
+            signals = signal_gen.process_row(row, col_idx, date)
 
             for sig in signals:
-                pa = row_prices.get(sig.symbol_a, 0)
-                pb = row_prices.get(sig.symbol_b, 0)
+                pa = float(row[col_idx[sig.symbol_a]])
+                pb = float(row[col_idx[sig.symbol_b]])
                 if pa > 0 and pb > 0:
-                    executor.execute_signal(sig, pa, pb)
+                    executor.execute_signal(sig, pa, pb, bar_idx=i)
                     monitor.record_signal(sig.latency_ms, sig.signal_type.value)
 
             # Mark to market
-            executor.mark_to_market(row_prices, date)
-            monitor.check_drawdown(executor.snapshots[-1].drawdown if executor.snapshots else 0)
+            snap = executor.mark_to_market_vec(row, col_idx, date)
+            monitor.check_drawdown(snap.drawdown)
 
             ticks_processed += len(test_prices.columns)
 
             # Progress
             if (i + 1) % 100 == 0:
-                eq = executor.snapshots[-1].equity if executor.snapshots else 0
-                print(f"    Day {i+1}/{len(test_prices)}: equity=${eq:,.0f} | "
-                      f"positions={executor.snapshots[-1].n_positions} | "
+                print(f"    Day {i+1}/{len(test_prices)}: equity=${snap.equity:,.0f} | "
+                      f"positions={snap.n_positions} | "
                       f"trades={len(executor.trades)}")
 
         bt_elapsed = time.perf_counter() - bt_start
 
         # --- Step 5: Results ---
         metrics = compute_metrics(
-            executor.snapshots, executor.trades,
+            executor.snapshot_columns, executor.trades,
             ticks_processed, bt_elapsed,
+            initial_capital=self.cfg.trading.initial_capital,
         )
         print_metrics(metrics)
         monitor.print_report()
@@ -171,20 +177,22 @@ def main():
     if result:
         # Export equity curve
         snaps = result["snapshots"]
-        df = pd.DataFrame([{
-            "date": s.timestamp, "equity": s.equity, "cash": s.cash,
-            "drawdown": s.drawdown, "n_positions": s.n_positions,
-        } for s in snaps])
+        df = pd.DataFrame.from_records(
+            map(attrgetter("timestamp", "equity", "cash", "drawdown", "n_positions"), snaps),
+            columns=["date", "equity", "cash", "drawdown", "n_positions"],
+        )
         df.to_csv("output/equity_curve.csv", index=False)
 
         # Export trades
         trades = result["trades"]
-        td = pd.DataFrame([{
-            "pair": t.pair_id, "direction": t.direction,
-            "entry": t.entry_time, "exit": t.exit_time,
-            "pnl": t.pnl, "return": t.return_pct,
-            "holding_days": t.holding_days, "exit_reason": t.exit_reason,
-        } for t in trades])
+        td = pd.DataFrame.from_records(
+            map(attrgetter(
+                "pair_id", "direction", "entry_time", "exit_time",
+                "pnl", "return_pct", "holding_days", "exit_reason",
+            ), trades),
+            columns=["pair", "direction", "entry", "exit", "pnl", "return", "holding_days", "exit_reason"],
+        )
+        td = td.astype({"direction": "category", "exit_reason": "category"})
         td.to_csv("output/trades.csv", index=False)
         print("Exported: output/equity_curve.csv, output/trades.csv")
 
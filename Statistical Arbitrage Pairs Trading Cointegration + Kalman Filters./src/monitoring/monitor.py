@@ -2,51 +2,106 @@
 Monitoring: Prometheus metrics, latency tracking, degradation alerts.
 """
 
+import math
+import sys
 import time
+from collections import deque
 from dataclasses import dataclass, field
-from typing import List
+from itertools import islice
+from typing import Deque, Optional
+import numpy as np
 import structlog
 
-logger = structlog.get_logger()
+try:
+    from sortedcontainers import SortedList
+except ImportError:  # pragma: no cover - percentiles fall back to np.partition
+    SortedList = None
 
+logger = structlog.get_logger()
 
-@dataclass
+_RULE = "=" * 60
+# Report body as one template; the recent-alert lines (variable count) and
+# closing rule are appended after it
+_REPORT_TMPL = (
+    f"\n{_RULE}\n"
+    "  MONITORING REPORT\n"
+    f"{_RULE}\n"
+    "  Ticks processed:    {ticks_processed:,}\n"
+    "  Signals generated:  {signals_generated}\n"
+    "  Signal latency avg: {signal_latency_avg_ms:.3f} ms\n"
+    "  Signal latency std: {signal_latency_std_ms:.3f} ms\n"
+    "  Signal latency p95: {signal_latency_p95_ms:.3f} ms\n"
+    "  Signal latency max: {signal_latency_max_ms:.3f} ms\n"
+    "  Alerts:             {alerts}\n"
+)
+_REPORT_END = f"{_RULE}\n\n"
+
+
+@dataclass(eq=False)
 class LatencyStats:
     count: int = 0
-    total_ms: float = 0.0
+    mean_ms: float = 0.0
+    m2: float = 0.0      # Sum of squared deviations from the mean (Welford)
     max_ms: float = 0.0
     min_ms: float = float("inf")
-    p50_buffer: List[float] = field(default_factory=list)
+    window: int = 10000  # Most recent samples kept for percentiles
+    _buffer: np.ndarray = field(init=False, repr=False)
+    _pos: int = field(default=0, init=False, repr=False)
+    _sorted: Optional["SortedList"] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        if self.window < 1:
+            raise ValueError(f"window must be >= 1, got {self.window}")
+        self._buffer = np.empty(self.window)
+        # Same window kept in sorted order (when sortedcontainers is
+        # installed) so percentile reads are an O(log n) index
+        if SortedList is not None:
+            self._sorted = SortedList()
 
     def record(self, ms: float):
         self.count += 1
-        self.total_ms += ms
+        delta = ms - self.mean_ms
+        self.mean_ms += delta / self.count
+        self.m2 += delta * (ms - self.mean_ms)
         self.max_ms = max(self.max_ms, ms)
         self.min_ms = min(self.min_ms, ms)
-        self.p50_buffer.append(ms)
-        if len(self.p50_buffer) > 10000:
-            self.p50_buffer = self.p50_buffer[-5000:]
+        # Ring buffer: overwrite the oldest sample once the window is full
+        if self._sorted is not None:
+            if self.count > self.window:
+                self._sorted.remove(self._buffer[self._pos])
+            self._sorted.add(ms)
+        self._buffer[self._pos] = ms
+        self._pos = (self._pos + 1) % self.window
 
     @property
     def avg_ms(self) -> float:
-        return self.total_ms / self.count if self.count > 0 else 0.0
+        return self.mean_ms
+
+    @property
+    def std_ms(self) -> float:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
 
     @property
     def p95_ms(self) -> float:
-        if not self.p50_buffer:
+        n = min(self.count, self.window)
+        if n == 0:
             return 0.0
-        s = sorted(self.p50_buffer)
-        idx = int(len(s) * 0.95)
-        return s[min(idx, len(s) - 1)]
+        idx = min(int(n * 0.95), n - 1)
+        if self._sorted is not None:
+            return float(self._sorted[idx])
+        return float(np.partition(self._buffer[:n], idx)[idx])
 
 
 class MonitoringService:
     """Tracks system health, latency, and triggers degradation alerts."""
 
+    MAX_ALERTS = 1024  # Most recent alert messages kept; older ones are only counted
+
     def __init__(self, alert_latency_ms=100.0, alert_drawdown_pct=0.10):
         self.signal_latency = LatencyStats()
         self.tick_latency = LatencyStats()
-        self.alerts: List[str] = []
+        self.alerts: Deque[str] = deque(maxlen=self.MAX_ALERTS)
+        self._n_alerts = 0
         self.alert_latency_ms = alert_latency_ms
         self.alert_drawdown_pct = alert_drawdown_pct
         self._ticks_processed = 0
@@ -72,6 +127,7 @@ class MonitoringService:
 
     def _alert(self, msg: str):
         self.alerts.append(msg)
+        self._n_alerts += 1
         logger.warning("monitoring_alert", alert=msg)
 
     def summary(self) -> dict:
@@ -79,25 +135,15 @@ class MonitoringService:
             "ticks_processed": self._ticks_processed,
             "signals_generated": self._signals_generated,
             "signal_latency_avg_ms": round(self.signal_latency.avg_ms, 3),
+            "signal_latency_std_ms": round(self.signal_latency.std_ms, 3),
             "signal_latency_p95_ms": round(self.signal_latency.p95_ms, 3),
             "signal_latency_max_ms": round(self.signal_latency.max_ms, 3),
             "tick_latency_avg_ms": round(self.tick_latency.avg_ms, 3),
-            "alerts": len(self.alerts),
-            "recent_alerts": self.alerts[-5:] if self.alerts else [],
+            "alerts": self._n_alerts,
+            "recent_alerts": list(islice(reversed(self.alerts), 5))[::-1],
         }
 
     def print_report(self):
         s = self.summary()
-        print(f"\n{'='*60}")
-        print(f"  MONITORING REPORT")
-        print(f"{'='*60}")
-        print(f"  Ticks processed:    {s['ticks_processed']:,}")
-        print(f"  Signals generated:  {s['signals_generated']}")
-        print(f"  Signal latency avg: {s['signal_latency_avg_ms']:.3f} ms")
-        print(f"  Signal latency p95: {s['signal_latency_p95_ms']:.3f} ms")
-        print(f"  Signal latency max: {s['signal_latency_max_ms']:.3f} ms")
-        print(f"  Alerts:             {s['alerts']}")
-        if s['recent_alerts']:
-            for a in s['recent_alerts']:
-                print(f"    ⚠ {a}")
-        print(f"{'='*60}\n")
+        alert_lines = "".join(f"    ⚠ {a}\n" for a in s["recent_alerts"])
+        sys.stdout.write(_REPORT_TMPL.format_map(s) + alert_lines + _REPORT_END)
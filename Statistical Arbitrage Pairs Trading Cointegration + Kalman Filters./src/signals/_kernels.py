@@ -0,0 +1,26 @@
+"""
+Small jitted building blocks shared by the signal kernels.
+
+Compiled with Numba when it is installed (see src.utils.jit); called from
+other njit functions they are inlined into the caller's native loop.
+"""
+
+from typing import Tuple
+
+from src.utils.jit import njit
+
+
+@njit(cache=True)
+def welford_update(mean: float, m2: float, n: int, x: float) -> Tuple[float, float, int]:
+    """
+    Add sample x to running moments (Welford's online algorithm).
+
+    Returns the updated (mean, m2, n); the sample variance is m2 / (n - 1).
+    Unlike E[x²] - E[x]², this does not cancel catastrophically on long
+    streams with a large mean.
+    """
+    n += 1
+    delta = x - mean
+    mean += delta / n
+    m2 += delta * (x - mean)
+    return mean, m2, n
@@ -8,22 +8,37 @@ Pipeline:
 4. Rank pairs by cointegration strength and return top N
 """
 
+import multiprocessing
+import os
 import numpy as np
 import pandas as pd
 from typing import List, Tuple, Optional
 from dataclasses import dataclass
-from itertools import combinations
-from statsmodels.tsa.vector_ar.vecm import coint_johansen
-from statsmodels.regression.linear_model import OLS
-from statsmodels.tools import add_constant
 import structlog
+from statsmodels.tsa.adfvalues import mackinnonp
+from statsmodels.tsa.stattools import adfuller
 
 from src.config import config
+from src.signals._kernels import welford_update
+from src.utils.jit import njit
 
 logger = structlog.get_logger()
 
+# Below this many candidate pairs per worker, process start-up and pickling
+# cost more than the Johansen tests they would parallelize.
+MIN_PAIRS_PER_WORKER = 16
 
-@dataclass
+# Johansen trace critical values (90%, 95%, 99%) for two series with a
+# constant (det_order=0), keyed by the null rank r; Osterwald-Lenum tables
+# as shipped in statsmodels' c_sjt.
+TRACE_CRITICAL_VALUES = {
+    0: (13.4294, 15.4943, 19.9349),
+    1: (2.7055, 3.8415, 6.6349),
+}
+TRACE_CRIT_5PCT = TRACE_CRITICAL_VALUES[0][1]
+
+
+@dataclass(slots=True)
 class CointegratedPair:
     symbol_a: str
     symbol_b: str
@@ -55,24 +70,63 @@ class CointegrationScanner:
         symbols = list(prices.columns)
         n = len(symbols)
         logger.info("scan_started", n_symbols=n, n_candidate_pairs=n * (n - 1) // 2)
-
-        # Step 1: Correlation pre-filter
-        corr_matrix = prices.pct_change().dropna().corr()
-        candidate_pairs = []
-
-        for i, j in combinations(range(n), 2):
-            corr = abs(corr_matrix.iloc[i, j])
-            if corr >= self.cfg.min_correlation:
-                candidate_pairs.append((symbols[i], symbols[j], corr))
+        if len(prices) < self.cfg.min_history_days:
+            # No pair can have enough overlapping history
+            logger.info("scan_complete", cointegrated_pairs=0)
+            return []
+
+        # Step 1: Correlation pre-filter over the upper triangle (i < j)
+        values = np.asfortranarray(prices.to_numpy(dtype=np.float64))
+        corr_matrix = _return_correlation(values)
+        iu, ju = np.triu_indices(n, k=1)
+        corr = np.abs(corr_matrix[iu, ju])
+        keep = corr >= self.cfg.min_correlation
+        candidate_pairs = list(zip(iu[keep].tolist(), ju[keep].tolist(), corr[keep].tolist()))
 
         logger.info("correlation_filter", candidates=len(candidate_pairs), threshold=self.cfg.min_correlation)
 
-        # Step 2: Johansen cointegration test on each candidate
-        pairs = []
-        for sym_a, sym_b, corr in candidate_pairs:
-            result = self._test_pair(prices[sym_a], prices[sym_b], sym_a, sym_b, corr)
-            if result is not None:
-                pairs.append(result)
+        # Step 2: Johansen cointegration test. With no gaps every pair shares
+        # one sample, so all candidates are tested at once from a single Gram
+        # matrix and only cointegrated ones reach the per-pair checks; with
+        # gaps each pair is tested on its own overlapping history.
+        if candidate_pairs and not np.isnan(values).any():
+            gram = _johansen_moments(values)
+            i, j, c = iu[keep], ju[keep], corr[keep]
+            idx = np.stack([i, j, n + i, n + j, 2 * n + i, 2 * n + j], axis=1)
+            stats, vecs = _johansen_trace_batch(
+                gram[idx[:, :, None], idx[:, None, :]], len(values) - 2
+            )
+            passed = stats >= TRACE_CRIT_5PCT
+            i, j, c, stats, vecs = i[passed], j[passed], c[passed], stats[passed], vecs[passed]
+            logger.info("johansen_filter", candidates=len(i))
+
+            # Spread statistics for every survivor in one parallel kernel
+            hedge = -vecs[:, 1] / vecs[:, 0]
+            pair_stats = _pair_stats_batch(values, i, j, hedge)
+            results = [
+                _score_pair(
+                    self.cfg, symbols[a], symbols[b], corr_ab, trace_stat, hr,
+                    tuple(row), values[:, a], values[:, b],
+                )
+                for a, b, corr_ab, trace_stat, hr, row in zip(
+                    i.tolist(), j.tolist(), c.tolist(), stats.tolist(), hedge.tolist(),
+                    pair_stats.tolist(),
+                )
+            ]
+        else:
+            # One task per pair carrying just its two price columns; starmap
+            # batches tasks per worker and returns results in candidate order.
+            tasks = [
+                (self.cfg, values[:, i], values[:, j], symbols[i], symbols[j], c)
+                for i, j, c in candidate_pairs
+            ]
+            n_workers = self._n_workers(len(tasks))
+            if n_workers > 1:
+                with multiprocessing.Pool(n_workers) as pool:
+                    results = pool.starmap(_test_pair, tasks)
+            else:
+                results = [_test_pair(*task) for task in tasks]
+        pairs = [p for p in results if p is not None]
 
         # Step 3: Sort by composite score and take top N
         pairs.sort(key=lambda p: p.score, reverse=True)
@@ -81,83 +135,15 @@ class CointegrationScanner:
         logger.info("scan_complete", cointegrated_pairs=len(pairs))
         return pairs
 
-    def _test_pair(
-        self, series_a: pd.Series, series_b: pd.Series,
-        sym_a: str, sym_b: str, correlation: float
-    ) -> Optional[CointegratedPair]:
-        """Run Johansen cointegration test on a pair."""
-        try:
-            data = pd.concat([series_a, series_b], axis=1).dropna()
-            if len(data) < self.cfg.min_history_days:
-                return None
-
-            # Johansen test (det_order=-1 = no deterministic terms, 1 lag)
-            result = coint_johansen(data.values, det_order=0, k_ar_diff=1)
-
-            trace_stat = result.lr1[0]      # Trace statistic for r=0
-            crit_value = result.cvt[0, 1]   # 5% critical value
-
-            if trace_stat < crit_value:
-                return None  # Not cointegrated
-
-            # Extract hedge ratio from eigenvector
-            eigenvec = result.evec[:, 0]
-            hedge_ratio = -eigenvec[1] / eigenvec[0]
-
-            # Compute spread
-            spread = series_a.values - hedge_ratio * series_b.values
-
-            # Estimate half-life via AR(1) on spread
-            half_life = self._estimate_half_life(spread)
-            if half_life < self.cfg.half_life_min or half_life > self.cfg.half_life_max:
-                return None
-
-            # ADF test on spread
-            from statsmodels.tsa.stattools import adfuller
-            adf_result = adfuller(spread, maxlag=1)
-            adf_pvalue = adf_result[1]
-
-            if adf_pvalue > self.cfg.significance_level:
-                return None  # Spread not stationary
-
-            spread_mean = float(np.mean(spread))
-            spread_std = float(np.std(spread))
-
-            # Composite score: higher trace stat + lower half-life + lower ADF p-value
-            score = (trace_stat / crit_value) * (1.0 / half_life) * (1.0 - adf_pvalue)
-
-            return CointegratedPair(
-                symbol_a=sym_a,
-                symbol_b=sym_b,
-                hedge_ratio=float(hedge_ratio),
-                half_life=float(half_life),
-                correlation=float(correlation),
-                trace_stat=float(trace_stat),
-                critical_value=float(crit_value),
-                spread_mean=spread_mean,
-                spread_std=spread_std,
-                adf_pvalue=float(adf_pvalue),
-                score=float(score),
-            )
-        except Exception as e:
-            logger.debug("pair_test_failed", sym_a=sym_a, sym_b=sym_b, error=str(e))
-            return None
+    def _n_workers(self, n_candidates: int) -> int:
+        """Worker processes to use for the pair tests (1 = run in-process)."""
+        n_jobs = self.cfg.n_jobs if self.cfg.n_jobs > 0 else (os.cpu_count() or 1)
+        return max(1, min(n_jobs, n_candidates // MIN_PAIRS_PER_WORKER))
 
     @staticmethod
     def _estimate_half_life(spread: np.ndarray) -> float:
         """Estimate mean-reversion half-life via AR(1) regression on spread."""
-        spread_lag = spread[:-1]
-        spread_diff = np.diff(spread)
-
-        spread_lag = add_constant(spread_lag)
-        model = OLS(spread_diff, spread_lag).fit()
-
-        theta = model.params[1]  # Mean-reversion coefficient
-        if theta >= 0:
-            return 999.0  # Not mean-reverting
-
-        half_life = -np.log(2) / theta
-        return float(half_life)
+        return float(_ar1_half_life(np.ascontiguousarray(spread, dtype=np.float64)))
 
     @staticmethod
     def compute_spread(
@@ -168,9 +154,364 @@ class CointegrationScanner:
 
     @staticmethod
     def compute_zscore(spread: np.ndarray, window: int = 60) -> np.ndarray:
-        """Compute rolling z-score of spread."""
-        s = pd.Series(spread)
-        mean = s.rolling(window).mean()
-        std = s.rolling(window).std()
-        z = (s - mean) / std
-        return z.values
+        """
+        Compute rolling z-score of spread (sample std over the trailing window).
+
+        The first window-1 values and windows containing NaN are NaN; a flat
+        window scores 0.
+        """
+        return _rolling_zscore(np.ascontiguousarray(spread, dtype=np.float64), window)
+
+
+@njit(cache=True, fastmath=True)
+def _ar1_half_life(spread: np.ndarray) -> float:
+    """
+    Half-life from the OLS slope (with intercept) of Δs_t on s_{t-1}, in
+    closed form: theta = cov(s_{t-1}, Δs_t) / var(s_{t-1}).
+    """
+    n = spread.shape[0] - 1
+    mx = 0.0
+    my = 0.0
+    for t in range(n):
+        mx += spread[t]
+        my += spread[t + 1] - spread[t]
+    mx /= n
+    my /= n
+    num = 0.0
+    den = 0.0
+    for t in range(n):
+        dx = spread[t] - mx
+        num += dx * (spread[t + 1] - spread[t] - my)
+        den += dx * dx
+    if not den > 0:
+        return 999.0  # Constant spread: no mean reversion to measure
+    theta = num / den  # Mean-reversion coefficient
+    if theta >= 0:
+        return 999.0  # Not mean-reverting
+    return -np.log(2.0) / theta
+
+
+@njit(cache=True)
+def _df_regression(x: np.ndarray, start: int, with_lag: bool) -> Tuple[float, float, int]:
+    """
+    OLS of Δx_t on [1, x_t] (plus Δx_{t-1} if with_lag) over t >= start,
+    where Δx_t = x[t+1] - x[t]. Returns (t-stat of the x_t coefficient,
+    residual sum of squares, nobs).
+    """
+    m = x.shape[0] - 1
+    nobs = m - start
+    my = 0.0
+    mx = 0.0
+    ml = 0.0
+    for t in range(start, m):
+        my += x[t + 1] - x[t]
+        mx += x[t]
+        if with_lag:
+            ml += x[t] - x[t - 1]
+    my /= nobs
+    mx /= nobs
+    ml /= nobs
+
+    # Centred cross products (the constant drops out)
+    sxx = 0.0
+    sxy = 0.0
+    sll = 0.0
+    sxl = 0.0
+    sly = 0.0
+    for t in range(start, m):
+        y = x[t + 1] - x[t] - my
+        dx = x[t] - mx
+        sxx += dx * dx
+        sxy += dx * y
+        if with_lag:
+            dl = x[t] - x[t - 1] - ml
+            sll += dl * dl
+            sxl += dx * dl
+            sly += dl * y
+
+    if with_lag:
+        det = sxx * sll - sxl * sxl
+        if not det > 0:
+            return np.nan, np.nan, nobs  # Collinear regressors
+        bx = (sll * sxy - sxl * sly) / det
+        bl = (sxx * sly - sxl * sxy) / det
+        inv_xx = sll / det
+        k = 3
+    else:
+        if not sxx > 0:
+            return np.nan, np.nan, nobs  # Constant level
+        bx = sxy / sxx
+        bl = 0.0
+        inv_xx = 1.0 / sxx
+        k = 2
+
+    ssr = 0.0
+    for t in range(start, m):
+        r = x[t + 1] - x[t] - my - bx * (x[t] - mx)
+        if with_lag:
+            r -= bl * (x[t] - x[t - 1] - ml)
+        ssr += r * r
+    se2 = ssr / (nobs - k) * inv_xx
+    if not se2 > 0:
+        return np.nan, ssr, nobs  # Perfect fit
+    return bx / np.sqrt(se2), ssr, nobs
+
+
+@njit(cache=True)
+def _adf_stat(x: np.ndarray) -> float:
+    """
+    ADF t-statistic as statsmodels' adfuller(x, maxlag=1) computes it
+    (constant, lag 0 or 1 picked by AIC on a common sample, then refit).
+    """
+    t0, ssr0, nobs = _df_regression(x, 1, False)
+    t1, ssr1, _ = _df_regression(x, 1, True)
+    # AIC = nobs * log(ssr / nobs) + 2k + const; ties go to the shorter lag
+    if nobs * np.log(ssr1) + 6.0 < nobs * np.log(ssr0) + 4.0:
+        return t1
+    t0, _, _ = _df_regression(x, 0, False)
+    return t0
+
+
+@njit(cache=True)
+def _pair_stats(prices_a: np.ndarray, prices_b: np.ndarray, hedge_ratio: float) -> Tuple[float, float, float, float]:
+    """(half-life, ADF statistic, mean, std) of the spread a - hedge_ratio * b."""
+    spread = prices_a - hedge_ratio * prices_b
+    return _ar1_half_life(spread), _adf_stat(spread), np.mean(spread), np.std(spread)
+
+
+@njit(cache=True)
+def _pair_stats_batch(
+    values: np.ndarray, idx_a: np.ndarray, idx_b: np.ndarray, hedge: np.ndarray,
+) -> np.ndarray:
+    """
+    _pair_stats for columns (idx_a[k], idx_b[k]) of values, one row per pair.
+
+    Serial on purpose: a threaded (parallel=True) kernel would leave Numba's
+    thread pool running in a process that may later fork the scan's
+    multiprocessing.Pool.
+    """
+    out = np.empty((idx_a.shape[0], 4))
+    for k in range(idx_a.shape[0]):
+        (
+            out[k, 0], out[k, 1], out[k, 2], out[k, 3],
+        ) = _pair_stats(values[:, idx_a[k]], values[:, idx_b[k]], hedge[k])
+    return out
+
+
+@njit(cache=True)
+def _rolling_zscore(x: np.ndarray, window: int) -> np.ndarray:
+    """
+    One pass over x with a sliding-window Welford update of the mean and M2;
+    the run restarts after a NaN so windows containing one stay NaN. Every
+    `window` slides the moments are recomputed from the window itself so
+    rounding error cannot accumulate (amortized O(1) per sample).
+    """
+    n = x.shape[0]
+    out = np.full(n, np.nan)
+    if window < 2:
+        return out
+
+    mean = 0.0
+    m2 = 0.0
+    count = 0  # Consecutive non-NaN samples, capped at window
+    slides = 0
+    for i in range(n):
+        v = x[i]
+        if np.isnan(v):
+            mean = 0.0
+            m2 = 0.0
+            count = 0
+            slides = 0
+            continue
+        if count < window:
+            mean, m2, count = welford_update(mean, m2, count, v)
+        elif slides == window:
+            slides = 0
+            mean = 0.0
+            for j in range(i - window + 1, i + 1):
+                mean += x[j]
+            mean /= window
+            m2 = 0.0
+            for j in range(i - window + 1, i + 1):
+                m2 += (x[j] - mean) * (x[j] - mean)
+        else:
+            slides += 1
+            old = x[i - window]
+            prev_mean = mean
+            mean += (v - old) / window
+            m2 += (v - old) * (v - mean + old - prev_mean)
+        if count == window:
+            var = m2 / (window - 1)
+            out[i] = (v - mean) / np.sqrt(var) if var > 0 else 0.0
+    return out
+
+
+def _return_correlation(values: np.ndarray) -> np.ndarray:
+    """
+    Pearson correlation of simple returns between all columns, from one GEMM
+    on the standardized return matrix. Dates where any symbol's return is
+    missing are dropped first, as pct_change().dropna().corr() did.
+    """
+    returns = values[1:] / values[:-1] - 1.0
+    returns = returns[~np.isnan(returns).any(axis=1)]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rz = (returns - returns.mean(axis=0)) / returns.std(axis=0, ddof=1)
+    return rz.T @ rz / (len(rz) - 1)
+
+
+def _johansen_moments(y: np.ndarray) -> np.ndarray:
+    """
+    Product-moment matrix for a Johansen test with a constant and one lagged
+    difference (coint_johansen with det_order=0, k_ar_diff=1).
+
+    For the n columns of ``y`` returns the (3n, 3n) Gram matrix of the
+    mean-centred blocks [ΔY_t, ΔY_{t-1}, Y_{t-1}] divided by T = len(y) - 2.
+    Any pair (i, j) reads its moments from rows/columns
+    [i, j, n+i, n+j, 2n+i, 2n+j].
+    """
+    n = y.shape[1]
+    dy = np.diff(y, axis=0)
+    z = np.empty((len(y) - 2, 3 * n), order="F")
+    z[:, :n] = dy[1:]
+    z[:, n:2 * n] = dy[:-1]
+    z[:, 2 * n:] = y[1:-1]
+    z -= z.mean(axis=0)
+    return z.T @ z / len(z)
+
+
+def _johansen_trace_batch(m: np.ndarray, t: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Johansen trace statistics (r=0) and leading eigenvectors for a stack of pairs.
+
+    ``m`` holds one 6x6 moment matrix per pair, shape (k, 6, 6), ordered
+    [ΔY_t, ΔY_{t-1}, Y_{t-1}]. Both ΔY_t and Y_{t-1} are residualized on
+    ΔY_{t-1} (Frisch-Waugh on the moments), then the eigenvalues of
+    C = S_kk⁻¹ S_k0 S_00⁻¹ S_0k give the test. Everything is 2x2, so the
+    inverses and the eigenproblem are solved in closed form for all pairs at
+    once: λ are the roots of λ² - tr(C)λ + det(C) = 0.
+
+    Returns trace statistics (k,) and eigenvectors (k, 2); pairs whose
+    moments are degenerate get a NaN statistic.
+    """
+    d, z, k = slice(0, 2), slice(2, 4), slice(4, 6)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        zz_inv = _inv2(m[:, z, z])
+        s00 = m[:, d, d] - m[:, d, z] @ zz_inv @ m[:, z, d]
+        sk0 = m[:, k, d] - m[:, k, z] @ zz_inv @ m[:, z, d]
+        skk = m[:, k, k] - m[:, k, z] @ zz_inv @ m[:, z, k]
+        c = _inv2(skk) @ sk0 @ _inv2(s00) @ sk0.transpose(0, 2, 1)
+        c00, c01, c10, c11 = c[:, 0, 0], c[:, 0, 1], c[:, 1, 0], c[:, 1, 1]
+
+        half_tr = 0.5 * (c00 + c11)
+        disc = np.sqrt(np.maximum(half_tr * half_tr - (c00 * c11 - c01 * c10), 0.0))
+        lam1, lam2 = half_tr + disc, half_tr - disc
+        trace_stat = -t * (np.log(1.0 - lam1) + np.log(1.0 - lam2))
+    trace_stat[~np.isfinite(trace_stat)] = np.nan
+
+    # Null-space direction of C - λ1·I, taken from its better-conditioned row
+    use_row0 = np.abs(lam1 - c00) + np.abs(c01) >= np.abs(c10) + np.abs(lam1 - c11)
+    eigenvec = np.where(
+        use_row0[:, None],
+        np.column_stack((c01, lam1 - c00)),
+        np.column_stack((lam1 - c11, c10)),
+    )
+    eigenvec[~eigenvec.any(axis=1)] = (1.0, 0.0)
+    return trace_stat, eigenvec
+
+
+def _johansen_trace(m: np.ndarray, t: int) -> Tuple[float, np.ndarray]:
+    """_johansen_trace_batch for a single 6x6 moment matrix."""
+    trace_stat, eigenvec = _johansen_trace_batch(m[None], t)
+    return float(trace_stat[0]), eigenvec[0]
+
+
+def _inv2(a: np.ndarray) -> np.ndarray:
+    """Closed-form inverse of a stack of 2x2 matrices (inf/NaN where singular)."""
+    det = a[..., 0, 0] * a[..., 1, 1] - a[..., 0, 1] * a[..., 1, 0]
+    adj = np.stack((
+        np.stack((a[..., 1, 1], -a[..., 0, 1]), axis=-1),
+        np.stack((-a[..., 1, 0], a[..., 0, 0]), axis=-1),
+    ), axis=-2)
+    return adj / det[..., None, None]
+
+
+def _test_pair(
+    cfg, prices_a: np.ndarray, prices_b: np.ndarray,
+    sym_a: str, sym_b: str, correlation: float,
+) -> Optional[CointegratedPair]:
+    """
+    Run Johansen cointegration test on a pair (module-level so Pool workers
+    can pickle it).
+
+    ``prices_a``/``prices_b`` are the two price columns (NaN = no quote);
+    the test uses the dates where both are quoted.
+    """
+    try:
+        data = np.column_stack((prices_a, prices_b))
+        data = data[~np.isnan(data).any(axis=1)]
+        if len(data) < cfg.min_history_days:
+            return None
+
+        # Johansen test (det_order=0 = constant, 1 lagged difference)
+        trace_stat, eigenvec = _johansen_trace(_johansen_moments(data), len(data) - 2)
+        if not trace_stat >= TRACE_CRIT_5PCT:
+            return None  # Not cointegrated (NaN = degenerate moments)
+
+        # Extract hedge ratio from eigenvector
+        hedge_ratio = -eigenvec[1] / eigenvec[0]
+        a = np.ascontiguousarray(data[:, 0])
+        b = np.ascontiguousarray(data[:, 1])
+        return _score_pair(
+            cfg, sym_a, sym_b, correlation, trace_stat, hedge_ratio,
+            _pair_stats(a, b, hedge_ratio), a, b,
+        )
+    except Exception as e:
+        logger.debug("pair_test_failed", sym_a=sym_a, sym_b=sym_b, error=str(e))
+        return None
+
+
+def _score_pair(
+    cfg, sym_a: str, sym_b: str, correlation: float, trace_stat: float, hedge_ratio: float,
+    pair_stats: Tuple[float, float, float, float],
+    prices_a: np.ndarray, prices_b: np.ndarray,
+) -> Optional[CointegratedPair]:
+    """
+    Apply the half-life and ADF filters to a Johansen-cointegrated pair and
+    score it. ``pair_stats`` is _pair_stats of its spread; the prices are
+    only read if the closed-form ADF statistic is degenerate.
+    """
+    half_life, adf_stat, spread_mean, spread_std = pair_stats
+    if half_life < cfg.half_life_min or half_life > cfg.half_life_max:
+        return None
+
+    # ADF test on spread: closed-form statistic, full adfuller only if
+    # the spread is degenerate
+    try:
+        if np.isfinite(adf_stat):
+            adf_pvalue = mackinnonp(adf_stat, regression="c", N=1)
+        else:
+            adf_pvalue = adfuller(prices_a - hedge_ratio * prices_b, maxlag=1)[1]
+    except Exception as e:
+        logger.debug("pair_test_failed", sym_a=sym_a, sym_b=sym_b, error=str(e))
+        return None
+
+    if adf_pvalue > cfg.significance_level:
+        return None  # Spread not stationary
+
+    # Composite score: higher trace stat + lower half-life + lower ADF p-value
+    crit_value = TRACE_CRIT_5PCT
+    score = (trace_stat / crit_value) * (1.0 / half_life) * (1.0 - adf_pvalue)
+
+    return CointegratedPair(
+        symbol_a=sym_a,
+        symbol_b=sym_b,
+        hedge_ratio=float(hedge_ratio),
+        half_life=float(half_life),
+        correlation=float(correlation),
+        trace_stat=float(trace_stat),
+        critical_value=float(crit_value),
+        spread_mean=float(spread_mean),
+        spread_std=float(spread_std),
+        adf_pvalue=float(adf_pvalue),
+        score=float(score),
+    )
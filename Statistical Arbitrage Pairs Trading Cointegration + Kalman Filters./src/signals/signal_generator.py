@@ -12,7 +12,7 @@ import numpy as np
 import pandas as pd
 from dataclasses import dataclass
 from enum import Enum
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
 import time
 import structlog
 
@@ -31,7 +31,38 @@ class SignalType(Enum):
     HOLD = "hold"                # No action
 
 
-@dataclass
+# Per-pair position state codes (SignalGenerator._pos)
+_FLAT, _LONG, _SHORT = 0, 1, 2
+
+# Signal codes produced by the vectorized bar path, indexing _SIGNAL_TYPES
+_SIG_HOLD, _SIG_LONG, _SIG_SHORT, _SIG_EXIT, _SIG_STOP = range(5)
+_SIGNAL_TYPES = (
+    SignalType.HOLD, SignalType.ENTER_LONG, SignalType.ENTER_SHORT,
+    SignalType.EXIT, SignalType.STOP_LOSS,
+)
+# Position state after each signal code (HOLD leaves it unchanged)
+_POS_AFTER = np.array([_FLAT, _LONG, _SHORT, _FLAT, _FLAT], dtype=np.int8)
+
+
+def _build_decide_lut() -> np.ndarray:
+    """
+    Signal code for every combination of the threshold tests, keyed by
+    in_position*16 + (|z| > stop)*8 + (|z| < exit)*4 + (z < -entry)*2 + (z > entry).
+    In a position, stop takes precedence over exit.
+    """
+    lut = np.empty(32, dtype=np.int8)
+    for key in range(32):
+        if key & 16:
+            lut[key] = _SIG_STOP if key & 8 else _SIG_EXIT if key & 4 else _SIG_HOLD
+        else:
+            lut[key] = _SIG_LONG if key & 2 else _SIG_SHORT if key & 1 else _SIG_HOLD
+    return lut
+
+
+_DECIDE_LUT = _build_decide_lut()
+
+
+@dataclass(slots=True)
 class TradingSignal:
     pair_id: str
     symbol_a: str
@@ -49,13 +80,30 @@ class SignalGenerator:
     """
     Generates trading signals for cointegrated pairs using Kalman-filtered
     hedge ratios and z-score thresholds.
+
+    cfg is the TradingConfig and kalman_cfg the KalmanConfig for the pair
+    tracker; each defaults to the global config's section.
     """
 
-    def __init__(self, pairs: List[CointegratedPair], cfg=None):
+    def __init__(self, pairs: List[CointegratedPair], cfg=None, kalman_cfg=None):
         self.cfg = cfg or config.trading
         self.pairs = {f"{p.symbol_a}_{p.symbol_b}": p for p in pairs}
-        self.kalman = KalmanPairTracker()
-        self._positions: Dict[str, SignalType] = {}  # pair_id -> current position
+        self.kalman = KalmanPairTracker(kalman_cfg)
+
+        # Pair layout shared with the Kalman tracker's state arrays: each
+        # pair_id maps once to an int slot and per-pair data lives in arrays
+        # indexed by it
+        self._pair_ids = list(self.pairs)
+        self._pid2idx = {pair_id: i for i, pair_id in enumerate(self._pair_ids)}
+        self._pos = np.zeros(len(self._pair_ids), dtype=np.int8)  # _FLAT/_LONG/_SHORT per pair
+        self._symbols_a = [p.symbol_a for p in self.pairs.values()]
+        self._symbols_b = [p.symbol_b for p in self.pairs.values()]
+        self._idx_map: Optional[Dict[str, int]] = None  # Copy of the col_idx the leg indices refer to
+        self._a_idx = np.empty(0, dtype=np.intp)
+        self._b_idx = np.empty(0, dtype=np.intp)
+        self._bar_frame: Optional[pd.DataFrame] = None  # Frame _bar_values was taken from
+        self._bar_values = np.empty((0, 0))
+        self._bar_col_idx: Dict[str, int] = {}
 
         # Initialize Kalman filters with cointegration hedge ratios
         for pair_id, pair in self.pairs.items():
@@ -72,55 +120,27 @@ class SignalGenerator:
         """
         t0 = time.perf_counter()
 
-        pair = self.pairs.get(pair_id)
-        if pair is None:
+        idx = self._pid2idx.get(pair_id)
+        if idx is None:
             return self._no_signal(pair_id, timestamp, 0.0)
 
         # Update Kalman filter
-        state = self.kalman.update(pair_id, price_a, price_b)
-        z = self.kalman.get_zscore(pair_id, price_a, price_b)
-        hedge = self.kalman.get_hedge_ratio(pair_id)
-        spread = state.spread
-
-        current_pos = self._positions.get(pair_id)
-
-        # Determine signal
-        signal_type = SignalType.HOLD
-        confidence = 0.0
-
-        if current_pos in (SignalType.ENTER_LONG, SignalType.ENTER_SHORT):
-            # Already in position — check for exit or stop
-            if abs(z) > self.cfg.stop_z:
-                signal_type = SignalType.STOP_LOSS
-                confidence = 1.0
-            elif abs(z) < self.cfg.exit_z:
-                signal_type = SignalType.EXIT
-                confidence = 1.0 - abs(z) / self.cfg.exit_z
-        else:
-            # Not in position — check for entry
-            if z < -self.cfg.entry_z:
-                signal_type = SignalType.ENTER_LONG
-                confidence = min(abs(z) / self.cfg.stop_z, 1.0)
-            elif z > self.cfg.entry_z:
-                signal_type = SignalType.ENTER_SHORT
-                confidence = min(abs(z) / self.cfg.stop_z, 1.0)
-
-        # Update position tracker
-        if signal_type in (SignalType.ENTER_LONG, SignalType.ENTER_SHORT):
-            self._positions[pair_id] = signal_type
-        elif signal_type in (SignalType.EXIT, SignalType.STOP_LOSS):
-            self._positions.pop(pair_id, None)
+        kalman = self.kalman
+        kalman.update_slot(idx, price_a, price_b)
+        z = kalman.zscore_slot(idx, price_a, price_b)
+
+        signal_type, confidence = self._decide(idx, z)
 
         latency_ms = (time.perf_counter() - t0) * 1000
 
         return TradingSignal(
             pair_id=pair_id,
-            symbol_a=pair.symbol_a,
-            symbol_b=pair.symbol_b,
+            symbol_a=self._symbols_a[idx],
+            symbol_b=self._symbols_b[idx],
             signal_type=signal_type,
             zscore=float(z),
-            hedge_ratio=float(hedge),
-            spread=float(spread),
+            hedge_ratio=float(kalman.hedge_ratios[idx]),
+            spread=float(kalman.spreads[idx]),
             timestamp=timestamp,
             latency_ms=latency_ms,
             confidence=confidence,
@@ -129,19 +149,126 @@ class SignalGenerator:
     def process_bar(
         self, prices: pd.DataFrame, date: pd.Timestamp
     ) -> List[TradingSignal]:
-        """Process daily bar for all pairs. Returns list of non-HOLD signals."""
-        signals = []
-        for pair_id, pair in self.pairs.items():
-            if pair.symbol_a in prices.columns and pair.symbol_b in prices.columns:
-                price_a = prices.loc[date, pair.symbol_a]
-                price_b = prices.loc[date, pair.symbol_b]
-                signal = self.process_tick(pair_id, price_a, price_b, date)
-                if signal.signal_type != SignalType.HOLD:
-                    signals.append(signal)
-        return signals
+        """
+        Process daily bar for all pairs. Returns list of non-HOLD signals.
+
+        The frame's float64 matrix is built once per frame object and reused
+        on later calls with the same frame, so edits made to it in place
+        between calls are not seen; pass a new frame, or use process_row.
+        """
+        if self._bar_frame is not prices:
+            self._bar_frame = prices
+            self._bar_values = prices.to_numpy(dtype=np.float64)
+            self._bar_col_idx = {sym: j for j, sym in enumerate(prices.columns)}
+        row = self._bar_values[prices.index.get_loc(date)]
+        return self.process_row(row, self._bar_col_idx, date)
+
+    def process_row(
+        self, price_row: np.ndarray, col_idx: Dict[str, int], timestamp: pd.Timestamp
+    ) -> List[TradingSignal]:
+        """
+        Process one bar given as a row of a price matrix.
+
+        Args:
+            price_row: Prices for every symbol, laid out as in col_idx
+            col_idx: Symbol -> column position in price_row
+
+        Pairs whose symbols are missing from col_idx are skipped.
+        """
+        # Compared by contents, so a col_idx remapped in place is picked up
+        if self._idx_map != col_idx:
+            self._idx_map = dict(col_idx)
+            self._a_idx = np.array([col_idx.get(s, -1) for s in self._symbols_a], dtype=np.intp)
+            self._b_idx = np.array([col_idx.get(s, -1) for s in self._symbols_b], dtype=np.intp)
+        price_a = price_row[self._a_idx]
+        price_b = price_row[self._b_idx]
+        if (self._a_idx < 0).any() or (self._b_idx < 0).any():
+            price_a = np.where(self._a_idx < 0, np.nan, price_a)
+            price_b = np.where(self._b_idx < 0, np.nan, price_b)
+        return self.process_pairs(price_a, price_b, timestamp)
+
+    def process_pairs(
+        self, price_a: np.ndarray, price_b: np.ndarray, timestamp: pd.Timestamp
+    ) -> List[TradingSignal]:
+        """
+        Process one bar for all pairs at once. Returns list of non-HOLD signals.
+
+        Args:
+            price_a: Prices of each pair's A leg, in pair order (NaN = no quote)
+            price_b: Prices of each pair's B leg, in pair order (NaN = no quote)
+
+        All Kalman filters are stepped with a single vectorized update and every
+        pair is classified at once into an integer signal code; the reported
+        latency is the whole bar's processing time.
+        """
+        t0 = time.perf_counter()
+
+        self.kalman.update_all(price_a, price_b)
+        z = self.kalman.zscores(price_a, price_b)
+        hedges = self.kalman.hedge_ratios
+        spreads = self.kalman.spreads
+        quoted = np.isfinite(price_a) & np.isfinite(price_b)
+
+        # Same lookup as _decide, for every pair at once
+        az = np.abs(z)
+        cfg = self.cfg
+        key = (
+            (self._pos != _FLAT) * 16 + (az > cfg.stop_z) * 8 + (az < cfg.exit_z) * 4
+            + (z < -cfg.entry_z) * 2 + (z > cfg.entry_z)
+        )
+        codes = np.where(quoted, _DECIDE_LUT[key], _SIG_HOLD)
+        fired = np.flatnonzero(codes)
+        fired_codes = codes[fired]
+        self._pos[fired] = _POS_AFTER[fired_codes]
+
+        az_fired = az[fired]
+        confidence = np.select(
+            [fired_codes == _SIG_STOP, fired_codes == _SIG_EXIT],
+            [1.0, 1.0 - az_fired / self.cfg.exit_z],
+            default=np.minimum(az_fired / self.cfg.stop_z, 1.0),
+        )
+
+        latency_ms = (time.perf_counter() - t0) * 1000
+
+        return [
+            TradingSignal(
+                pair_id=self._pair_ids[i],
+                symbol_a=self._symbols_a[i],
+                symbol_b=self._symbols_b[i],
+                signal_type=_SIGNAL_TYPES[code],
+                zscore=float(z[i]),
+                hedge_ratio=float(hedges[i]),
+                spread=float(spreads[i]),
+                timestamp=timestamp,
+                latency_ms=latency_ms,
+                confidence=conf,
+            )
+            for i, code, conf in zip(fired.tolist(), fired_codes.tolist(), confidence.tolist())
+        ]
+
+    def _decide(self, slot: int, z: float) -> Tuple[SignalType, float]:
+        """Apply z-score thresholds to the pair in slot and update its position state."""
+        az = abs(z)
+        cfg = self.cfg
+        key = (
+            (self._pos[slot] != _FLAT) * 16 + (az > cfg.stop_z) * 8 + (az < cfg.exit_z) * 4
+            + (z < -cfg.entry_z) * 2 + (z > cfg.entry_z)
+        )
+        code = int(_DECIDE_LUT[key])
+        if code == _SIG_HOLD:
+            return SignalType.HOLD, 0.0
+
+        self._pos[slot] = _POS_AFTER[code]
+        if code == _SIG_STOP:
+            confidence = 1.0
+        elif code == _SIG_EXIT:
+            confidence = 1.0 - az / cfg.exit_z
+        else:
+            confidence = min(az / cfg.stop_z, 1.0)
+        return _SIGNAL_TYPES[code], confidence
 
     def active_positions(self) -> int:
-        return len(self._positions)
+        return int(np.count_nonzero(self._pos))
 
     def _no_signal(self, pair_id, ts, latency):
         return TradingSignal(pair_id, "", "", SignalType.HOLD, 0, 0, 0, ts, latency, 0)
@@ -0,0 +1,23 @@
+"""
+Optional Numba JIT support.
+
+Hot numeric kernels are decorated with `njit` from this module. When Numba is
+installed they are compiled to native code; otherwise the decorator is a no-op
+and the same functions run as plain Python/NumPy.
+"""
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:  # pragma: no cover - exercised only without numba
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit (supports bare and called forms)."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def decorator(func):
+            return func
+        return decorator
@@ -2,12 +2,14 @@
 Performance metrics for pairs trading strategy evaluation.
 """
 
+import sys
+
 import numpy as np
 import pandas as pd
 from dataclasses import dataclass
-from typing import List
+from typing import List, Optional, Union
 
-from src.execution.engine import TradeRecord, PortfolioSnapshot
+from src.execution.engine import TradeRecord, PortfolioSnapshot, SnapshotColumns
 
 
 @dataclass
@@ -34,17 +36,30 @@ class StrategyMetrics:
 
 
 def compute_metrics(
-    snapshots: List[PortfolioSnapshot],
+    snapshots: Union[SnapshotColumns, List[PortfolioSnapshot]],
     trades: List[TradeRecord],
     ticks_processed: int = 0,
     elapsed_sec: float = 1.0,
     risk_free_rate: float = 0.04,
+    initial_capital: Optional[float] = None,
 ) -> StrategyMetrics:
-    """Compute comprehensive strategy performance metrics."""
+    """
+    Compute comprehensive strategy performance metrics.
+
+    snapshots is normally the engine's SnapshotColumns; a list of
+    PortfolioSnapshot objects is still accepted.
+
+    The drawdown peak starts at initial_capital when given, as the engine's
+    does, so a loss before the first snapshot counts towards max_drawdown.
+    Without it the peak starts at the first snapshot's equity.
+    """
     if len(snapshots) < 2:
         return StrategyMetrics(0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0)
 
-    equities = np.array([s.equity for s in snapshots])
+    if isinstance(snapshots, SnapshotColumns):
+        equities = snapshots.equity
+    else:
+        equities = np.fromiter((s.equity for s in snapshots), dtype=np.float64, count=len(snapshots))
     returns = np.diff(equities) / equities[:-1]
     n = len(returns)
     years = n / 252.0
@@ -55,39 +70,41 @@ def compute_metrics(
 
     daily_rf = risk_free_rate / 252
     excess = returns - daily_rf
-    sharpe = (np.mean(excess) / np.std(excess) * np.sqrt(252)) if np.std(excess) > 0 else 0
+    excess_std = excess.std()
+    sharpe = (excess.mean() / excess_std * np.sqrt(252)) if excess_std > 0 else 0
 
     downside = returns[returns < daily_rf]
     down_dev = np.std(downside) * np.sqrt(252) if len(downside) > 1 else 0
     sortino = (ann_ret - risk_free_rate) / down_dev if down_dev > 0 else 0
 
-    max_dd = max(s.drawdown for s in snapshots) if snapshots else 0
+    peaks = np.maximum.accumulate(equities)
+    if initial_capital is not None:
+        np.maximum(peaks, initial_capital, out=peaks)
+    max_dd = float((1 - equities / peaks).max())
     calmar = ann_ret / max_dd if max_dd > 0 else 0
 
-    # Trade metrics
-    winners = [t for t in trades if t.pnl > 0]
-    losers = [t for t in trades if t.pnl <= 0]
-    stops = [t for t in trades if t.exit_reason == "stop_loss"]
-
-    win_rate = len(winners) / len(trades) if trades else 0
-    gross_profit = sum(t.pnl for t in winners) if winners else 0
-    gross_loss = abs(sum(t.pnl for t in losers)) if losers else 0
+    # Trade metrics: pull the per-trade fields out once, then mask
+    n_trades = len(trades)
+    pnl = np.fromiter((t.pnl for t in trades), dtype=np.float64, count=n_trades)
+    holding = np.fromiter((t.holding_days for t in trades), dtype=np.float64, count=n_trades)
+    is_stop = np.fromiter((t.exit_reason == "stop_loss" for t in trades), dtype=bool, count=n_trades)
+    is_win = pnl > 0
+    n_winners = int(np.count_nonzero(is_win))
+    n_losers = n_trades - n_winners
+
+    win_rate = n_winners / n_trades if n_trades else 0
+    gross_profit = pnl.sum(where=is_win)
+    gross_loss = abs(pnl.sum(where=~is_win))
     profit_factor = gross_profit / gross_loss if gross_loss > 0 else (999 if gross_profit > 0 else 0)
 
-    avg_pnl = np.mean([t.pnl for t in trades]) if trades else 0
-    avg_winner = np.mean([t.pnl for t in winners]) if winners else 0
-    avg_loser = np.mean([abs(t.pnl) for t in losers]) if losers else 0
-    avg_holding = np.mean([t.holding_days for t in trades]) if trades else 0
-
-    # Max consecutive losses
-    max_consec = 0
-    current_streak = 0
-    for t in trades:
-        if t.pnl <= 0:
-            current_streak += 1
-            max_consec = max(max_consec, current_streak)
-        else:
-            current_streak = 0
+    avg_pnl = pnl.mean() if n_trades else 0
+    avg_winner = gross_profit / n_winners if n_winners else 0
+    avg_loser = gross_loss / n_losers if n_losers else 0
+    avg_holding = holding.mean() if n_trades else 0
+
+    # Max consecutive losses: longest run of non-winners, from run edges
+    edges = np.flatnonzero(np.diff(np.concatenate(([False], ~is_win, [False])).astype(np.int8)))
+    max_consec = int((edges[1::2] - edges[::2]).max()) if len(edges) else 0
 
     tps = ticks_processed / elapsed_sec if elapsed_sec > 0 else 0
 
@@ -97,32 +114,40 @@ def compute_metrics(
         max_drawdown=max_dd, calmar_ratio=calmar, win_rate=win_rate,
         profit_factor=profit_factor, avg_trade_pnl=avg_pnl,
         avg_winner=avg_winner, avg_loser=avg_loser,
-        total_trades=len(trades), winning_trades=len(winners), losing_trades=len(losers),
+        total_trades=n_trades, winning_trades=n_winners, losing_trades=n_losers,
         avg_holding_days=avg_holding,
-        stop_loss_pct=len(stops) / len(trades) if trades else 0,
+        stop_loss_pct=np.count_nonzero(is_stop) / n_trades if n_trades else 0,
         max_consecutive_losses=max_consec, ticks_per_sec=tps,
     )
 
 
+_RULE = "=" * 60
+
+# Whole report as one template ("%" fields print the fraction times 100)
+_METRICS_TMPL = (
+    f"\n{_RULE}\n"
+    "  PAIRS TRADING STRATEGY RESULTS\n"
+    f"{_RULE}\n"
+    "  Total Return:        {total_return:>9.1%}\n"
+    "  Annualized Return:   {annualized_return:>9.1%}\n"
+    "  Annualized Vol:      {annualized_volatility:>9.1%}\n"
+    "  Sharpe Ratio:        {sharpe_ratio:>8.2f}\n"
+    "  Sortino Ratio:       {sortino_ratio:>8.2f}\n"
+    "  Calmar Ratio:        {calmar_ratio:>8.2f}\n"
+    "  Max Drawdown:        {max_drawdown:>9.1%}\n"
+    "  Win Rate:            {win_rate:>9.1%}\n"
+    "  Profit Factor:       {profit_factor:>8.2f}\n"
+    "  Avg Trade P&L:       ${avg_trade_pnl:>10,.0f}\n"
+    "  Avg Winner:          ${avg_winner:>10,.0f}\n"
+    "  Avg Loser:           ${avg_loser:>10,.0f}\n"
+    "  Total Trades:        {total_trades:>8}\n"
+    "  Avg Holding (days):  {avg_holding_days:>8.1f}\n"
+    "  Stop-Loss Rate:      {stop_loss_pct:>9.1%}\n"
+    "  Max Consec Losses:   {max_consecutive_losses:>8}\n"
+    "  Throughput:          {ticks_per_sec:>8,.0f} ticks/sec\n"
+    f"{_RULE}\n\n"
+)
+
+
 def print_metrics(m: StrategyMetrics):
-    print(f"\n{'='*60}")
-    print(f"  PAIRS TRADING STRATEGY RESULTS")
-    print(f"{'='*60}")
-    print(f"  Total Return:        {m.total_return*100:>8.1f}%")
-    print(f"  Annualized Return:   {m.annualized_return*100:>8.1f}%")
-    print(f"  Annualized Vol:      {m.annualized_volatility*100:>8.1f}%")
-    print(f"  Sharpe Ratio:        {m.sharpe_ratio:>8.2f}")
-    print(f"  Sortino Ratio:       {m.sortino_ratio:>8.2f}")
-    print(f"  Calmar Ratio:        {m.calmar_ratio:>8.2f}")
-    print(f"  Max Drawdown:        {m.max_drawdown*100:>8.1f}%")
-    print(f"  Win Rate:            {m.win_rate*100:>8.1f}%")
-    print(f"  Profit Factor:       {m.profit_factor:>8.2f}")
-    print(f"  Avg Trade P&L:       ${m.avg_trade_pnl:>10,.0f}")
-    print(f"  Avg Winner:          ${m.avg_winner:>10,.0f}")
-    print(f"  Avg Loser:           ${m.avg_loser:>10,.0f}")
-    print(f"  Total Trades:        {m.total_trades:>8}")
-    print(f"  Avg Holding (days):  {m.avg_holding_days:>8.1f}")
-    print(f"  Stop-Loss Rate:      {m.stop_loss_pct*100:>8.1f}%")
-    print(f"  Max Consec Losses:   {m.max_consecutive_losses:>8}")
-    print(f"  Throughput:          {m.ticks_per_sec:>8,.0f} ticks/sec")
-    print(f"{'='*60}\n")
+    sys.stdout.write(_METRICS_TMPL.format_map(vars(m)))
@@ -3,6 +3,8 @@ Test suite for the Pairs Trading Pipeline.
 Tests cointegration detection, Kalman filter, signal generation, execution, and metrics.
 """
 
+import sys
+
 import numpy as np
 import pandas as pd
 import pytest
@@ -15,6 +17,13 @@ from src.execution.engine import ExecutionEngine, PairPosition
 from src.utils.metrics import compute_metrics
 from src.config import Config, CointegrationConfig, TradingConfig, KalmanConfig
 
+# Shared timestamps, parsed once at import
+_TS_2021_01_01 = pd.Timestamp("2021-01-01")
+_TS_2021_01_02 = pd.Timestamp("2021-01-02")
+_TS_2021_01_03 = pd.Timestamp("2021-01-03")
+_TS_2021_01_11 = pd.Timestamp("2021-01-11")
+_TS_2021_02_01 = pd.Timestamp("2021-02-01")
+
 
 # ============================================================
 # DATA GENERATION TESTS
@@ -41,16 +50,34 @@ class TestDataGenerator:
         prices, _ = DataGenerator.generate_universe(n_pairs=5, n_noise=3, n_days=252)
         assert not prices.isna().any().any()
 
+    def test_tick_stream_layout(self):
+        prices, _ = DataGenerator.generate_universe(n_pairs=2, n_noise=1, n_days=10)
+        ticks = DataGenerator.simulate_tick_stream(prices, ticks_per_bar=20)
+        assert len(ticks) == 10 * 5 * 20
+        assert list(ticks.columns) == ["symbol", "timestamp", "price", "volume"]
+        first_bar = ticks.iloc[:20]
+        assert (first_bar["symbol"] == prices.columns[0]).all()
+        assert first_bar["timestamp"].is_monotonic_increasing
+        assert (ticks["price"] > 0).all()
+
 
 # ============================================================
 # COINTEGRATION SCANNER TESTS
 # ============================================================
 
+@pytest.fixture(scope="module")
+def universe():
+    """5-pair, 3-noise, 500-day universe (seed 42), generated once per module.
+
+    Shared between tests: copy the prices before modifying them.
+    """
+    return DataGenerator.generate_universe(n_pairs=5, n_noise=3, n_days=500, seed=42)
+
+
 class TestCointegrationScanner:
-    def setup_method(self):
-        self.prices, self.true_pairs = DataGenerator.generate_universe(
-            n_pairs=5, n_noise=3, n_days=500, seed=42
-        )
+    @pytest.fixture(autouse=True)
+    def setup(self, universe):
+        self.prices, self.true_pairs = universe
         cfg = CointegrationConfig(
             min_history_days=100, max_pairs=50,
             significance_level=0.05, half_life_max=60,
@@ -79,6 +106,89 @@ class TestCointegrationScanner:
             for i in range(len(pairs) - 1):
                 assert pairs[i].score >= pairs[i + 1].score
 
+    def test_parallel_scan_matches_serial(self, monkeypatch):
+        import src.signals.cointegration as coint
+        monkeypatch.setattr(coint, "MIN_PAIRS_PER_WORKER", 1)
+        serial_cfg = CointegrationConfig(
+            min_history_days=100, max_pairs=50, half_life_max=60,
+            half_life_min=3, min_correlation=0.3, n_jobs=1,
+        )
+        parallel_cfg = CointegrationConfig(
+            min_history_days=100, max_pairs=50, half_life_max=60,
+            half_life_min=3, min_correlation=0.3, n_jobs=2,
+        )
+        # A gap sends the scan down the per-pair (pool) path
+        prices = self.prices.copy()
+        prices.iloc[10:15, 0] = np.nan
+        serial = CointegrationScanner(serial_cfg).scan(prices)
+        parallel = CointegrationScanner(parallel_cfg).scan(prices)
+        assert len(serial) > 0
+        assert [(p.symbol_a, p.symbol_b) for p in serial] == \
+            [(p.symbol_a, p.symbol_b) for p in parallel]
+
+    def test_scan_requires_min_history(self):
+        cfg = CointegrationConfig(
+            min_history_days=10_000, max_pairs=50, half_life_max=60,
+            half_life_min=3, min_correlation=0.3,
+        )
+        assert CointegrationScanner(cfg).scan(self.prices) == []
+
+    def test_batched_scan_matches_per_pair_tests(self):
+        from src.signals.cointegration import _test_pair
+        pairs = self.scanner.scan(self.prices)
+        assert len(pairs) > 0
+        for p in pairs:
+            ref = _test_pair(
+                self.scanner.cfg, self.prices[p.symbol_a].to_numpy(),
+                self.prices[p.symbol_b].to_numpy(), p.symbol_a, p.symbol_b, p.correlation,
+            )
+            assert ref is not None
+            assert p.hedge_ratio == pytest.approx(ref.hedge_ratio, rel=1e-8)
+            assert p.half_life == pytest.approx(ref.half_life, rel=1e-8)
+            assert p.adf_pvalue == pytest.approx(ref.adf_pvalue, rel=1e-6, abs=1e-12)
+            assert p.score == pytest.approx(ref.score, rel=1e-6)
+
+    def test_johansen_matches_statsmodels(self):
+        from statsmodels.tsa.vector_ar.vecm import coint_johansen
+        from src.signals.cointegration import (
+            TRACE_CRITICAL_VALUES, _johansen_moments, _johansen_trace,
+        )
+        pair = self.prices.iloc[:, :2].to_numpy()
+        ref = coint_johansen(pair, det_order=0, k_ar_diff=1)
+        trace_stat, eigenvec = _johansen_trace(_johansen_moments(pair), len(pair) - 2)
+        assert trace_stat == pytest.approx(ref.lr1[0], rel=1e-8)
+        assert -eigenvec[1] / eigenvec[0] == pytest.approx(
+            -ref.evec[1, 0] / ref.evec[0, 0], rel=1e-8
+        )
+        assert np.allclose([TRACE_CRITICAL_VALUES[0], TRACE_CRITICAL_VALUES[1]], ref.cvt)
+
+    def test_batched_johansen_matches_per_pair(self):
+        from src.signals.cointegration import (
+            _johansen_moments, _johansen_trace, _johansen_trace_batch,
+        )
+        values = self.prices.to_numpy()
+        n = values.shape[1]
+        gram = _johansen_moments(values)
+        i, j = np.triu_indices(n, k=1)
+        idx = np.stack([i, j, n + i, n + j, 2 * n + i, 2 * n + j], axis=1)
+        stats, vecs = _johansen_trace_batch(gram[idx[:, :, None], idx[:, None, :]], len(values) - 2)
+        for k in (0, 5, len(i) - 1):
+            stat, vec = _johansen_trace(_johansen_moments(values[:, [i[k], j[k]]]), len(values) - 2)
+            assert stats[k] == pytest.approx(stat, rel=1e-8)
+            assert vecs[k, 1] / vecs[k, 0] == pytest.approx(vec[1] / vec[0], rel=1e-8)
+
+    def test_adf_stat_matches_statsmodels(self):
+        from statsmodels.tsa.stattools import adfuller
+        from src.signals.cointegration import _adf_stat
+        rng = np.random.default_rng(5)
+        walk = np.cumsum(rng.standard_normal(400))
+        ar = np.zeros(400)
+        for t in range(1, 400):
+            ar[t] = 0.6 * ar[t - 1] - 0.3 * (ar[t - 1] - ar[t - 2] if t > 1 else 0) + rng.standard_normal()
+        for spread in (walk, ar, 50 + 3 * ar):
+            assert _adf_stat(spread) == pytest.approx(adfuller(spread, maxlag=1)[0], rel=1e-9)
+        assert np.isnan(_adf_stat(np.ones(50)))
+
     def test_half_life_estimation(self):
         # OU process with known half-life
         np.random.seed(42)
@@ -91,6 +201,19 @@ class TestCointegrationScanner:
         est = CointegrationScanner._estimate_half_life(spread)
         assert 10 < est < 40  # Rough bounds
 
+    def test_zscore_matches_pandas_rolling(self):
+        rng = np.random.default_rng(7)
+        spread = np.cumsum(rng.standard_normal(3000))
+        spread[100] = np.nan
+        spread[1500:1510] = np.nan
+        s = pd.Series(spread)
+        roll = s.rolling(60)
+        expected = ((s - roll.mean()) / roll.std()).to_numpy()
+        z = CointegrationScanner.compute_zscore(spread, 60)
+        np.testing.assert_array_equal(np.isnan(z), np.isnan(expected))
+        np.testing.assert_allclose(z, expected, rtol=1e-8, atol=1e-10)
+        assert np.all(CointegrationScanner.compute_zscore(np.ones(10), 3)[2:] == 0)
+
 
 # ============================================================
 # KALMAN FILTER TESTS
@@ -148,6 +271,98 @@ class TestKalmanFilter:
         tracker.remove_pair("AB")
         assert tracker.active_pairs == 1
 
+    def test_update_all_matches_per_pair_updates(self):
+        batch = KalmanPairTracker()
+        single = KalmanPairTracker()
+        for pid, beta in [("AB", 1.2), ("CD", 0.8), ("EF", 1.5)]:
+            batch.add_pair(pid, beta)
+            single.add_pair(pid, beta)
+
+        rng = np.random.default_rng(7)
+        for _ in range(50):
+            pb = 50 + rng.standard_normal(3) * 5
+            pa = 1.1 * pb + rng.standard_normal(3)
+            batch.update_all(pa, pb)
+            for pid, a, b in zip(["AB", "CD", "EF"], pa, pb):
+                single.update(pid, a, b)
+
+        z = batch.zscores(pa, pb)
+        for k, pid in enumerate(["AB", "CD", "EF"]):
+            assert batch.get_hedge_ratio(pid) == pytest.approx(single.get_hedge_ratio(pid))
+            assert z[k] == pytest.approx(single.get_zscore(pid, pa[k], pb[k]))
+
+    def test_update_all_rejects_mismatched_prices(self):
+        tracker = KalmanPairTracker()
+        tracker.add_pair("AB")
+        tracker.add_pair("CD")
+        with pytest.raises(ValueError):
+            tracker.update_all(np.array([100.0, 101.0, 102.0]), np.array([90.0, 91.0, 92.0]))
+        with pytest.raises(ValueError):
+            tracker.update_all(np.array([100.0]), np.array([90.0]))
+        with pytest.raises(ValueError):
+            tracker.update_all(np.array([100.0, 101.0]), np.array([90.0]))
+        assert tracker._n_updates.tolist() == [0, 0]
+
+    def test_update_batch_matches_per_pair_updates(self):
+        batch = KalmanPairTracker()
+        single = KalmanPairTracker()
+        for pid, beta in [("AB", 1.2), ("CD", 0.8), ("EF", 1.5)]:
+            batch.add_pair(pid, beta)
+            single.add_pair(pid, beta)
+
+        rng = np.random.default_rng(3)
+        for step in range(40):
+            pb = 50 + rng.standard_normal(2) * 5
+            pa = 1.1 * pb + rng.standard_normal(2)
+            ids = ["EF", "AB"] if step % 2 else ["CD", "GH"]
+            if step % 4 == 3:
+                # Same pairs addressed by slot instead of pair id
+                batch.update_batch(np.array([batch.pair_ids.index(p) for p in ids]), pa, pb)
+            else:
+                batch.update_batch(ids, pa, pb)
+            for pid, a, b in zip(ids, pa, pb):
+                single.update(pid, a, b)
+
+        assert batch.pair_ids == single.pair_ids == ["AB", "CD", "EF", "GH"]
+        for pid in batch.pair_ids:
+            assert batch.get_hedge_ratio(pid) == pytest.approx(single.get_hedge_ratio(pid))
+            assert batch.get_zscore(pid, 100, 90) == pytest.approx(single.get_zscore(pid, 100, 90))
+
+    def test_update_batch_rejects_bad_slots(self):
+        tracker = KalmanPairTracker()
+        tracker.add_pair("AB")
+        tracker.add_pair("CD")
+        pa, pb = np.array([100.0]), np.array([90.0])
+        with pytest.raises(IndexError):
+            tracker.update_batch(np.array([5000]), pa, pb)
+        with pytest.raises(IndexError):
+            tracker.update_batch(np.array([-1]), pa, pb)
+        with pytest.raises(ValueError):
+            tracker.update_batch(np.array([[0]]), pa, pb)
+        with pytest.raises(ValueError):
+            tracker.update_batch(np.array([0, 1]), pa, pb)
+        with pytest.raises(ValueError):
+            tracker.update_batch(["AB"], pa, np.array([90.0, 91.0]))
+        assert tracker._n_updates.tolist() == [0, 0]
+
+    def test_float32_tracker_follows_float64(self):
+        f64 = KalmanPairTracker()
+        f32 = KalmanPairTracker(KalmanConfig(dtype="float32"))
+        for tracker in (f64, f32):
+            tracker.add_pair("AB", 1.2)
+            tracker.add_pair("CD", 0.8)
+
+        rng = np.random.default_rng(3)
+        for _ in range(100):
+            pb = 50 + rng.standard_normal(2) * 5
+            pa = 1.1 * pb + rng.standard_normal(2)
+            f64.update_all(pa, pb)
+            f32.update_all(pa, pb)
+
+        assert f32.hedge_ratios.dtype == np.float32
+        assert np.allclose(f32.hedge_ratios, f64.hedge_ratios, rtol=1e-4)
+        assert np.allclose(f32.zscores(pa, pb), f64.zscores(pa, pb), atol=1e-3)
+
 
 # ============================================================
 # SIGNAL GENERATOR TESTS
@@ -165,28 +380,101 @@ class TestSignalGenerator:
         self.gen = SignalGenerator([self.pair], cfg)
 
     def test_hold_signal_within_thresholds(self):
-        sig = self.gen.process_tick("A_B", 100, 83, pd.Timestamp("2021-01-01"))
+        sig = self.gen.process_tick("A_B", 100, 83, _TS_2021_01_01)
         # First tick — unlikely to trigger extreme z-score
         assert sig.signal_type in (SignalType.HOLD, SignalType.ENTER_LONG, SignalType.ENTER_SHORT)
 
     def test_generates_entry_on_extreme_zscore(self):
         # Force extreme spread by giving very different prices
         for _ in range(100):
-            self.gen.process_tick("A_B", 100, 83, pd.Timestamp("2021-01-01"))
+            self.gen.process_tick("A_B", 100, 83, _TS_2021_01_01)
 
         # Now push price far from mean
-        sig = self.gen.process_tick("A_B", 200, 83, pd.Timestamp("2021-01-02"))
+        sig = self.gen.process_tick("A_B", 200, 83, _TS_2021_01_02)
         # With a large spread deviation, should get a signal
         assert sig.signal_type != SignalType.HOLD or sig.zscore != 0
 
     def test_active_positions_count(self):
         assert self.gen.active_positions() == 0
 
+    def test_kalman_config_reaches_tracker(self):
+        gen = SignalGenerator([self.pair], TradingConfig(), KalmanConfig(dtype="float32"))
+        assert gen.kalman.hedge_ratios.dtype == np.float32
+
+    def test_bar_signals_match_tick_signals(self):
+        pairs = [
+            CointegratedPair("A", "B", 1.2, 20, 0.8, 30, 15, 0, 2, 0.01, 5.0),
+            CointegratedPair("C", "D", 0.7, 15, 0.8, 25, 15, 0, 2, 0.01, 4.0),
+        ]
+        cfg = TradingConfig(entry_z=1.0, exit_z=0.5, stop_z=2.5)
+        by_bar = SignalGenerator(pairs, cfg)
+        by_tick = SignalGenerator(pairs, cfg)
+        col_idx = {"A": 0, "B": 1, "C": 2, "D": 3}
+
+        rng = np.random.default_rng(11)
+        prices = 100 + np.cumsum(rng.standard_normal((300, 4)), axis=0)
+        bar_signals, tick_signals = [], []
+        for t, row in enumerate(prices):
+            ts = _TS_2021_01_01 + pd.Timedelta(days=t)
+            bar_signals += [(s.pair_id, s.signal_type) for s in by_bar.process_row(row, col_idx, ts)]
+            for p in pairs:
+                sig = by_tick.process_tick(
+                    f"{p.symbol_a}_{p.symbol_b}", row[col_idx[p.symbol_a]], row[col_idx[p.symbol_b]], ts
+                )
+                if sig.signal_type != SignalType.HOLD:
+                    tick_signals.append((sig.pair_id, sig.signal_type))
+
+        assert len(bar_signals) > 0
+        assert bar_signals == tick_signals
+        assert by_bar.active_positions() == by_tick.active_positions()
+
+    def test_process_bar_matches_process_row(self):
+        pairs = [
+            CointegratedPair("A", "B", 1.0, 10, 0.9, 30, 15, 0, 1, 0.01, 5.0),
+            CointegratedPair("C", "D", 1.0, 10, 0.9, 30, 15, 0, 1, 0.01, 5.0),
+        ]
+        cfg = TradingConfig(entry_z=1.0, exit_z=0.5, stop_z=2.5)
+        by_frame = SignalGenerator(pairs, cfg)
+        by_row = SignalGenerator(pairs, cfg)
+
+        rng = np.random.default_rng(5)
+        dates = pd.date_range("2021-01-01", periods=200)
+        prices = pd.DataFrame(
+            100 + np.cumsum(rng.standard_normal((200, 4)), axis=0),
+            index=dates, columns=["A", "B", "C", "D"],
+        )
+        arr = prices.to_numpy()
+        col_idx = {sym: j for j, sym in enumerate(prices.columns)}
+        for i, date in enumerate(dates):
+            got = [(s.pair_id, s.signal_type) for s in by_frame.process_bar(prices, date)]
+            want = [(s.pair_id, s.signal_type) for s in by_row.process_row(arr[i], col_idx, date)]
+            assert got == want
+
 
 # ============================================================
 # EXECUTION ENGINE TESTS
 # ============================================================
 
+# Interned once so the engine's pair_id dict lookups compare by identity
+_PAIR_IDS = [sys.intern(f"P{i}") for i in range(5)]
+_SYMS_A = [sys.intern(f"A{i}") for i in range(5)]
+_SYMS_B = [sys.intern(f"B{i}") for i in range(5)]
+
+
+@pytest.fixture(scope="module")
+def entry_signals():
+    """ENTER_LONG signals for five distinct pairs, built once per module."""
+    return [
+        TradingSignal(
+            pair_id=pid, symbol_a=sym_a, symbol_b=sym_b,
+            signal_type=SignalType.ENTER_LONG, zscore=-2.5,
+            hedge_ratio=1.0, spread=-3.0, timestamp=_TS_2021_01_01,
+            latency_ms=0.1, confidence=0.8,
+        )
+        for pid, sym_a, sym_b in zip(_PAIR_IDS, _SYMS_A, _SYMS_B)
+    ]
+
+
 class TestExecutionEngine:
     def setup_method(self):
         cfg = TradingConfig(initial_capital=1_000_000, max_pairs_active=10)
@@ -202,7 +490,7 @@ class TestExecutionEngine:
             pair_id="AB", symbol_a="A", symbol_b="B",
             signal_type=SignalType.ENTER_LONG, zscore=-2.5,
             hedge_ratio=1.2, spread=-5.0,
-            timestamp=pd.Timestamp("2021-01-01"),
+            timestamp=_TS_2021_01_01,
             latency_ms=0.1, confidence=0.8,
         )
         self.engine.execute_signal(enter_sig, 100.0, 80.0)
@@ -212,26 +500,40 @@ class TestExecutionEngine:
             pair_id="AB", symbol_a="A", symbol_b="B",
             signal_type=SignalType.EXIT, zscore=0.3,
             hedge_ratio=1.2, spread=0.5,
-            timestamp=pd.Timestamp("2021-02-01"),
+            timestamp=_TS_2021_02_01,
             latency_ms=0.1, confidence=1.0,
         )
         trade = self.engine.execute_signal(exit_sig, 105.0, 84.0)
         assert len(self.engine.positions) == 0
         assert trade is not None
         assert trade.exit_reason == "mean_reversion"
+        assert trade.holding_days == 31
+
+    def test_holding_days_counts_bars_when_indexed(self):
+        enter_sig = TradingSignal(
+            pair_id="AB", symbol_a="A", symbol_b="B",
+            signal_type=SignalType.ENTER_SHORT, zscore=2.5,
+            hedge_ratio=1.0, spread=5.0,
+            timestamp=_TS_2021_01_01,
+            latency_ms=0.1, confidence=0.8,
+        )
+        exit_sig = TradingSignal(
+            pair_id="AB", symbol_a="A", symbol_b="B",
+            signal_type=SignalType.STOP_LOSS, zscore=4.5,
+            hedge_ratio=1.0, spread=9.0,
+            timestamp=_TS_2021_01_11,
+            latency_ms=0.1, confidence=1.0,
+        )
+        self.engine.execute_signal(enter_sig, 100.0, 100.0, bar_idx=3)
+        trade = self.engine.execute_signal(exit_sig, 101.0, 99.0, bar_idx=9)
+        assert trade.holding_days == 6
+        assert trade.exit_reason == "stop_loss"
 
-    def test_max_positions_enforced(self):
+    def test_max_positions_enforced(self, entry_signals):
         cfg = TradingConfig(initial_capital=10_000_000, max_pairs_active=2)
         engine = ExecutionEngine(cfg)
 
-        for i in range(5):
-            sig = TradingSignal(
-                pair_id=f"P{i}", symbol_a=f"A{i}", symbol_b=f"B{i}",
-                signal_type=SignalType.ENTER_LONG, zscore=-2.5,
-                hedge_ratio=1.0, spread=-3.0,
-                timestamp=pd.Timestamp("2021-01-01"),
-                latency_ms=0.1, confidence=0.8,
-            )
+        for sig in entry_signals:
             engine.execute_signal(sig, 100.0, 100.0)
 
         assert len(engine.positions) <= 2
@@ -241,14 +543,64 @@ class TestExecutionEngine:
             pair_id="AB", symbol_a="A", symbol_b="B",
             signal_type=SignalType.ENTER_LONG, zscore=-2.5,
             hedge_ratio=1.0, spread=-3.0,
-            timestamp=pd.Timestamp("2021-01-01"),
+            timestamp=_TS_2021_01_01,
             latency_ms=0.1, confidence=0.8,
         )
         self.engine.execute_signal(sig, 100.0, 100.0)
-        snap = self.engine.mark_to_market({"A": 105, "B": 98}, pd.Timestamp("2021-01-02"))
+        snap = self.engine.mark_to_market({"A": 105, "B": 98}, _TS_2021_01_02)
         assert snap.equity > 0
         assert snap.n_positions == 1
 
+    def test_mark_to_market_vec_matches_dict(self):
+        sig = TradingSignal(
+            pair_id="AB", symbol_a="A", symbol_b="B",
+            signal_type=SignalType.ENTER_SHORT, zscore=2.5,
+            hedge_ratio=1.0, spread=3.0,
+            timestamp=_TS_2021_01_01,
+            latency_ms=0.1, confidence=0.8,
+        )
+        self.engine.execute_signal(sig, 100.0, 100.0)
+        other = ExecutionEngine(TradingConfig(initial_capital=1_000_000, max_pairs_active=10))
+        other.execute_signal(sig, 100.0, 100.0)
+
+        snap = self.engine.mark_to_market({"A": 95, "B": 103}, _TS_2021_01_02)
+        row = np.array([0.0, 103.0, 95.0])
+        snap_vec = other.mark_to_market_vec(row, {"X": 0, "B": 1, "A": 2}, _TS_2021_01_02)
+        assert snap_vec.equity == pytest.approx(snap.equity)
+        assert other.positions["AB"].unrealized_pnl == pytest.approx(snap.positions_value)
+
+    def test_mark_to_market_vec_follows_in_place_remap(self):
+        sig = TradingSignal(
+            pair_id="AB", symbol_a="A", symbol_b="B",
+            signal_type=SignalType.ENTER_SHORT, zscore=2.5,
+            hedge_ratio=1.0, spread=3.0,
+            timestamp=_TS_2021_01_01,
+            latency_ms=0.1, confidence=0.8,
+        )
+        self.engine.execute_signal(sig, 100.0, 100.0)
+        col_idx = {"A": 0, "B": 1}
+        self.engine.mark_to_market_vec(np.array([95.0, 103.0]), col_idx, _TS_2021_01_02)
+
+        # Same dict object, columns swapped
+        col_idx["A"], col_idx["B"] = 1, 0
+        snap_vec = self.engine.mark_to_market_vec(np.array([103.0, 95.0]), col_idx, _TS_2021_01_03)
+        snap = self.engine.mark_to_market({"A": 95, "B": 103}, _TS_2021_01_03)
+        assert snap_vec.equity == pytest.approx(snap.equity)
+
+    def test_snapshot_buffer_grows_past_prealloc(self):
+        self.engine.prealloc_snapshots(2)
+        dates = pd.bdate_range("2021-01-04", periods=5)
+        marked = [self.engine.mark_to_market({}, d) for d in dates]
+        assert len(self.engine.snapshots) == 5
+        assert [s.timestamp for s in self.engine.snapshots] == list(dates)
+        assert self.engine.snapshots[-1].equity == marked[-1].equity == self.engine.equity
+        assert len(self.engine.snapshot_columns) == 5
+        np.testing.assert_array_equal(
+            self.engine.snapshot_columns.equity, [s.equity for s in marked]
+        )
+        assert compute_metrics(self.engine.snapshot_columns, []) == \
+            compute_metrics(self.engine.snapshots, [])
+
 
 # ============================================================
 # METRICS TESTS
@@ -258,13 +610,49 @@ class TestMetrics:
     def test_compute_basic_metrics(self):
         from src.execution.engine import PortfolioSnapshot, TradeRecord
         snaps = [
-            PortfolioSnapshot(pd.Timestamp("2021-01-01"), 1000000, 1000000, 0, 0, 0, 0, 0),
-            PortfolioSnapshot(pd.Timestamp("2021-01-02"), 1010000, 1010000, 0, 0.01, 0, 0, 0),
-            PortfolioSnapshot(pd.Timestamp("2021-01-03"), 1005000, 1005000, 0, -0.005, 0.005, 0, 0),
+            PortfolioSnapshot(_TS_2021_01_01, 1000000, 1000000, 0, 0, 0, 0, 0),
+            PortfolioSnapshot(_TS_2021_01_02, 1010000, 1010000, 0, 0.01, 0, 0, 0),
+            PortfolioSnapshot(_TS_2021_01_03, 1005000, 1005000, 0, -0.005, 0.005, 0, 0),
         ]
         m = compute_metrics(snaps, [], 0, 1.0)
         assert m.total_return > 0
-        assert m.max_drawdown >= 0
+        assert m.max_drawdown == pytest.approx(1 - 1005000 / 1010000)
+
+    def test_drawdown_peak_starts_at_initial_capital(self):
+        engine = ExecutionEngine(TradingConfig(initial_capital=1_000_000, commission_bps=0, slippage_bps=0))
+        engine.execute_signal(TradingSignal(
+            pair_id="A_B", symbol_a="A", symbol_b="B",
+            signal_type=SignalType.ENTER_LONG, zscore=-2.5,
+            hedge_ratio=1.0, spread=-3.0, timestamp=_TS_2021_01_01,
+            latency_ms=0.1, confidence=0.8,
+        ), 100, 100)
+        for day, pa in enumerate([99.0, 99.5, 100.0], start=1):
+            engine.mark_to_market({"A": pa, "B": 100}, _TS_2021_01_01 + pd.Timedelta(days=day))
+        engine_dd = float(engine.snapshot_columns.drawdown.max())
+        assert engine_dd > 0
+        m = compute_metrics(engine.snapshot_columns, [], initial_capital=1_000_000)
+        assert m.max_drawdown == pytest.approx(engine_dd)
+
+    def test_trade_metrics(self):
+        from src.execution.engine import PortfolioSnapshot, TradeRecord
+        snaps = [
+            PortfolioSnapshot(_TS_2021_01_01, 1000000, 1000000, 0, 0, 0, 0, 0),
+            PortfolioSnapshot(_TS_2021_01_02, 1010000, 1010000, 0, 0.01, 0, 0, 0),
+        ]
+        t0 = _TS_2021_01_01
+        pnls = [100.0, -50.0, 0.0, -25.0, 200.0, -10.0]
+        trades = [
+            TradeRecord("P", "A", "B", "long_spread", t0, t0, 0, 0, 0, 0, pnl, 0, 2 * k,
+                        "stop_loss" if pnl < 0 else "mean_reversion")
+            for k, pnl in enumerate(pnls)
+        ]
+        m = compute_metrics(snaps, trades, 0, 1.0)
+        assert (m.winning_trades, m.losing_trades) == (2, 4)
+        assert m.max_consecutive_losses == 3
+        assert m.profit_factor == pytest.approx(300.0 / 85.0)
+        assert m.avg_loser == pytest.approx(85.0 / 4)
+        assert m.avg_holding_days == pytest.approx(5.0)
+        assert m.stop_loss_pct == pytest.approx(0.5)
 
     def test_empty_snapshots(self):
         m = compute_metrics([], [], 0, 1.0)
@@ -272,16 +660,75 @@ class TestMetrics:
         assert m.sharpe_ratio == 0
 
 
+# ============================================================
+# MONITORING TESTS
+# ============================================================
+
+class TestMonitoring:
+    def test_latency_p95_over_recent_window(self):
+        from src.monitoring.monitor import LatencyStats
+        stats = LatencyStats(window=100)
+        for ms in range(1000):
+            stats.record(float(ms))
+        assert stats.count == 1000
+        assert stats.p95_ms == 995.0  # Only the last 100 samples (900..999) count
+        assert stats.max_ms == 999.0
+
+    def test_latency_p95_sorted_matches_partition(self, monkeypatch):
+        import src.monitoring.monitor as monitor
+        samples = np.random.default_rng(1).exponential(2.0, size=700)
+        sorted_stats = monitor.LatencyStats(window=250)
+        monkeypatch.setattr(monitor, "SortedList", None)
+        plain_stats = monitor.LatencyStats(window=250)
+        for k, ms in enumerate(samples):
+            sorted_stats.record(float(ms))
+            plain_stats.record(float(ms))
+            if k % 97 == 0:
+                assert sorted_stats.p95_ms == plain_stats.p95_ms
+        assert sorted_stats.p95_ms == plain_stats.p95_ms
+
+    def test_latency_window_must_be_positive(self):
+        from src.monitoring.monitor import LatencyStats
+        with pytest.raises(ValueError):
+            LatencyStats(window=0)
+
+    def test_latency_stats_compare_by_identity(self):
+        from src.monitoring.monitor import LatencyStats
+        a, b = LatencyStats(window=4), LatencyStats(window=4)
+        assert a == a
+        assert a != b
+
+    def test_latency_streaming_moments(self):
+        from src.monitoring.monitor import LatencyStats
+        samples = np.random.default_rng(0).exponential(2.0, size=500)
+        stats = LatencyStats()
+        for ms in samples:
+            stats.record(float(ms))
+        assert stats.avg_ms == pytest.approx(samples.mean())
+        assert stats.std_ms == pytest.approx(samples.std(ddof=1))
+
+    def test_alert_history_is_bounded(self):
+        from src.monitoring.monitor import MonitoringService
+        monitor = MonitoringService(alert_drawdown_pct=0.10)
+        n = MonitoringService.MAX_ALERTS + 10
+        for k in range(n):
+            monitor.check_drawdown(0.2 + k * 1e-4)
+        s = monitor.summary()
+        assert len(monitor.alerts) == MonitoringService.MAX_ALERTS
+        assert s["alerts"] == n
+        assert s["recent_alerts"] == list(monitor.alerts)[-5:]
+
+
 # ============================================================
 # INTEGRATION TEST
 # ============================================================
 
 class TestIntegration:
-    def test_full_pipeline_runs(self):
+    @pytest.mark.parametrize("dtype", [np.float64, np.float32])
+    def test_full_pipeline_runs(self, universe, dtype):
         """End-to-end: data → scan → signals → execution → metrics."""
-        prices, true_pairs = DataGenerator.generate_universe(
-            n_pairs=5, n_noise=3, n_days=500, seed=42
-        )
+        prices, true_pairs = universe
+        prices = prices.astype(dtype)
 
         scanner = CointegrationScanner(CointegrationConfig(
             min_history_days=100, max_pairs=20, min_correlation=0.3,
@@ -296,16 +743,33 @@ class TestIntegration:
             initial_capital=1_000_000, entry_z=2.0, exit_z=0.5,
         ))
         executor = ExecutionEngine(TradingConfig(initial_capital=1_000_000))
-
-        for date in prices.index[200:]:
-            signals = signal_gen.process_bar(prices, date)
+        executor.prealloc_snapshots(len(prices) - 200)
+
+        # Positional access: one price matrix row per bar instead of label lookups
+        arr = prices.to_numpy()
+        col_idx = {sym: j for j, sym in enumerate(prices.columns)}
+        for i in range(200, len(prices)):
+            date = prices.index[i]
+            price_row = arr[i]
+            signals = signal_gen.process_row(price_row, col_idx, date)
             for sig in signals:
-                pa = prices.loc[date, sig.symbol_a]
-                pb = prices.loc[date, sig.symbol_b]
+                pa = price_row[col_idx[sig.symbol_a]]
+                pb = price_row[col_idx[sig.symbol_b]]
                 executor.execute_signal(sig, pa, pb)
 
-            row = {sym: prices.loc[date, sym] for sym in prices.columns}
-            executor.mark_to_market(row, date)
+            executor.mark_to_market_vec(price_row, col_idx, date)
 
-        assert len(executor.snapshots) > 0
+        assert len(executor.snapshots) == len(prices) - 200
         assert executor.snapshots[-1].equity > 0
+
+    def test_float32_scan_matches_float64(self, universe):
+        prices, _ = universe
+        scanner = CointegrationScanner(CointegrationConfig(
+            min_history_days=100, max_pairs=20, min_correlation=0.3,
+            half_life_min=3, half_life_max=60,
+        ))
+        f64 = scanner.scan(prices.iloc[:200])
+        f32 = scanner.scan(prices.iloc[:200].astype(np.float32))
+        assert [(p.symbol_a, p.symbol_b) for p in f32] == [(p.symbol_a, p.symbol_b) for p in f64]
+        for a, b in zip(f32, f64):
+            assert a.hedge_ratio == pytest.approx(b.hedge_ratio, rel=1e-4)